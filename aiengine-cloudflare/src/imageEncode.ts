@@ -28,7 +28,11 @@ If there are multiple products in the scene, describe the ones that are:
 const descriptionModel = "gpt-4.1-mini";
 const textEmbeddingModel = "text-embedding-3-small";
 
-export const getImageEmbedding = async (imageBase64: string, client: OpenAI) => {
+export const getImageEmbedding = async (
+  imageBase64: string,
+  client: OpenAI,
+  embeddingFormat: "float" | "base64" = "float"
+) => {
   // Retrieve the text description of the image
   const textDescriptionResponse = await client.responses.create({
     model: descriptionModel,
@@ -60,9 +64,22 @@ export const getImageEmbedding = async (imageBase64: string, client: OpenAI) =>
   const textDescriptionEmbeddingResponse = await client.embeddings.create({
     model: textEmbeddingModel,
     input: textDescription,
-    encoding_format: "float",
+    encoding_format: embeddingFormat,
   });
 
+  if (embeddingFormat === "base64") {
+    // Passed through as OpenAI sends it: base64 of little-endian float32 values
+    const textDescriptionEmbeddingBase64 =
+      textDescriptionEmbeddingResponse.data[0].embedding as unknown as string;
+    return {
+      descriptionModel,
+      textEmbeddingModel,
+      textDescriptionEmbeddingDimensions: (textDescriptionEmbeddingBase64.length * 3) / 4 / 4,
+      textDesciription: textDescription,
+      textDescriptionEmbeddingBase64: textDescriptionEmbeddingBase64,
+    };
+  }
+
   const textDescriptionEmbedding =
     textDescriptionEmbeddingResponse.data[0].embedding;
 
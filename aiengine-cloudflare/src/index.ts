@@ -1,7 +1,7 @@
 import { Hono } from "hono";
 import { getImageEmbedding } from "./imageEncode";
 import OpenAI from "openai";
-import { directImageUploadSchema, base64ImageUploadSchema, healthSuggestionSchema, directImageUploadHealthSuggestionSchema } from "./zodSchema";
+import { directImageUploadSchema, base64ImageUploadSchema, imageEncodeSchema, healthSuggestionSchema, directImageUploadHealthSuggestionSchema } from "./zodSchema";
 import { image2Base64 } from "./utils";
 import { zValidator } from "@hono/zod-validator";
 import { getProductInformation } from "./productInformation";
@@ -19,14 +19,14 @@ app.get("/", (c) => {
 
 
 // Image encoding related endpoints
-app.post("/image-encode", zValidator('json', base64ImageUploadSchema), async (c) => {
+app.post("/image-encode", zValidator('json', imageEncodeSchema), async (c) => {
   const data = c.req.valid("json");
 
   const base64Image = data.image;
   const openaiClient = new OpenAI({
     apiKey: c.env.OPENAI_API_KEY,
   });
-  const encodeResult = await getImageEmbedding(base64Image, openaiClient);
+  const encodeResult = await getImageEmbedding(base64Image, openaiClient, data.embeddingFormat);
   // Return the result as JSON
   return c.json(encodeResult);
 })
@@ -29,6 +29,11 @@ export const directImageUploadSchema = z.object({ file: fileSchema });
 
 export const base64ImageUploadSchema = z.object({ image: base64Schema });
 
+// "base64" returns the embedding as little-endian float32 bytes instead of a JSON float list
+export const imageEncodeSchema = base64ImageUploadSchema.extend({
+  embeddingFormat: z.enum(["float", "base64"]).optional()
+});
+
 export const healthSuggestionSchema = base64ImageUploadSchema.merge(dietaryPrefSchema);
 
 export const directImageUploadHealthSuggestionSchema = directImageUploadSchema.merge(dietaryPrefSchema);
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""add maintenance checkpoints
+
+Revision ID: 0d7a3b9e5c18
+Revises: f6c2d8e1a4b5
+Create Date: 2026-10-18 17:42:10.208316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0d7a3b9e5c18'
+down_revision: Union[str, None] = 'f6c2d8e1a4b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('maintenance_checkpoints',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('maintenance_checkpoints')
@@ -0,0 +1,35 @@
+"""add product listing keyset index
+
+Revision ID: 3f1c9a7d2e10
+Revises: b4b9789d3a90
+Create Date: 2026-10-18 09:12:41.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2e10'
+down_revision: Union[str, None] = 'b4b9789d3a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The keyset cursor and the (last_updated, id) row comparison need a value on every row;
+    # legacy rows without one sort after everything else
+    op.execute("UPDATE products SET last_updated = 'epoch' WHERE last_updated IS NULL")
+    op.alter_column('products', 'last_updated', existing_type=sa.DateTime(), nullable=False)
+    # Keyset pagination of GET /products/ walks (last_updated, id) newest first
+    op.create_index('ix_products_last_updated_id', 'products', [sa.text('last_updated DESC'), sa.text('id DESC')], unique=False)
+    # Joining the current user's reviews into the listing
+    op.create_index('ix_reviews_user_id_product_id', 'reviews', ['user_id', 'product_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reviews_user_id_product_id', table_name='reviews')
+    op.drop_index('ix_products_last_updated_id', table_name='products')
+    op.alter_column('products', 'last_updated', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,35 @@
+"""add image ai results
+
+Revision ID: 5b7e0c4f9a21
+Revises: a2d84e6b1c37
+Create Date: 2026-10-18 11:21:05.640233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector.sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e0c4f9a21'
+down_revision: Union[str, None] = 'a2d84e6b1c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('image_ai_results',
+    sa.Column('image_hash', sa.String(length=64), nullable=False),
+    sa.Column('image_embedding', pgvector.sqlalchemy.Vector(dim=1536), nullable=True),
+    sa.Column('product_name', sa.String(length=255), nullable=True),
+    sa.Column('product_manufacturer', sa.Text(), nullable=True),
+    sa.Column('product_description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('image_hash')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('image_ai_results')
@@ -0,0 +1,50 @@
+"""add compact image embeddings
+
+Revision ID: 7c2e9f4a1b63
+Revises: 0d7a3b9e5c18
+Create Date: 2026-10-18 18:26:47.913402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9f4a1b63'
+down_revision: Union[str, None] = '0d7a3b9e5c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Stored generated columns: adding them rewrites products once, which backfills every
+    # existing row, and Postgres keeps them in sync with image_embedding from then on.
+    # Requires pgvector >= 0.7 (halfvec, bit ops, binary_quantize).
+    op.execute(
+        "ALTER TABLE products "
+        "ADD COLUMN image_embedding_half halfvec(1536) "
+        "GENERATED ALWAYS AS (image_embedding::halfvec(1536)) STORED, "
+        "ADD COLUMN image_embedding_bits bit(1536) "
+        "GENERATED ALWAYS AS (binary_quantize(image_embedding)::bit(1536)) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_image_embedding_half_hnsw "
+            "ON products USING hnsw (image_embedding_half halfvec_cosine_ops) "
+            "WITH (m = 16, ef_construction = 64)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_image_embedding_bits_hnsw "
+            "ON products USING hnsw (image_embedding_bits bit_hamming_ops) "
+            "WITH (m = 16, ef_construction = 64)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_products_image_embedding_bits_hnsw")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_products_image_embedding_half_hnsw")
+    op.drop_column('products', 'image_embedding_bits')
+    op.drop_column('products', 'image_embedding_half')
@@ -0,0 +1,40 @@
+"""add short image embedding
+
+Revision ID: 9a4d6e2f7c05
+Revises: 7c2e9f4a1b63
+Create Date: 2026-10-18 19:03:12.557184
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4d6e2f7c05'
+down_revision: Union[str, None] = '7c2e9f4a1b63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Renormalized 512-dim prefix of the text-embedding-3-small vector (Matryoshka truncation).
+    # Same as truncate_embedding() in product_service; generated, so existing rows are backfilled.
+    op.execute(
+        "ALTER TABLE products "
+        "ADD COLUMN image_embedding_short vector(512) "
+        "GENERATED ALWAYS AS (l2_normalize(subvector(image_embedding, 1, 512))::vector(512)) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_image_embedding_short_hnsw "
+            "ON products USING hnsw (image_embedding_short vector_cosine_ops) "
+            "WITH (m = 16, ef_construction = 64)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_products_image_embedding_short_hnsw")
+    op.drop_column('products', 'image_embedding_short')
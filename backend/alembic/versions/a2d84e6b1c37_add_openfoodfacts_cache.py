@@ -0,0 +1,36 @@
+"""add openfoodfacts cache
+
+Revision ID: a2d84e6b1c37
+Revises: 3f1c9a7d2e10
+Create Date: 2026-10-18 10:03:27.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2d84e6b1c37'
+down_revision: Union[str, None] = '3f1c9a7d2e10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('openfoodfacts_cache',
+    sa.Column('barcode', sa.String(length=255), nullable=False),
+    sa.Column('found', sa.Boolean(), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('barcode')
+    )
+    op.create_index(op.f('ix_openfoodfacts_cache_expires_at'), 'openfoodfacts_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_openfoodfacts_cache_expires_at'), table_name='openfoodfacts_cache')
+    op.drop_table('openfoodfacts_cache')
@@ -0,0 +1,37 @@
+"""add enrichment job health flags key
+
+Revision ID: a7f3c1e9d4b2
+Revises: e2b7c4a9d310
+Create Date: 2026-10-19 10:14:52.108334
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7f3c1e9d4b2'
+down_revision: Union[str, None] = 'e2b7c4a9d310'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('enrichment_jobs', sa.Column('health_flags_key', sa.Text(), nullable=True))
+    op.execute("""
+        UPDATE enrichment_jobs j SET health_flags_key = (
+            SELECT coalesce(string_agg(DISTINCT lower(trim(flag)), ',' ORDER BY lower(trim(flag))), '')
+            FROM jsonb_array_elements_text(j.payload -> 'health_flags') AS flag
+            WHERE trim(flag) <> ''
+        )
+        WHERE j.payload -> 'health_flags' IS NOT NULL AND j.status IN ('pending', 'running')
+    """)
+    # A known-product scan checks for a queued suggestion for its flag set
+    op.create_index('ix_enrichment_jobs_product_id_health_flags_key', 'enrichment_jobs', ['product_id', 'health_flags_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_enrichment_jobs_product_id_health_flags_key', table_name='enrichment_jobs')
+    op.drop_column('enrichment_jobs', 'health_flags_key')
@@ -0,0 +1,27 @@
+"""add product image dhash
+
+Revision ID: b3e81c5d9f27
+Revises: 9a4d6e2f7c05
+Create Date: 2026-10-18 19:47:35.120944
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e81c5d9f27'
+down_revision: Union[str, None] = '9a4d6e2f7c05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Filled for new scans; existing rows: python -m app.services.perceptual_hash --backfill
+    op.add_column('products', sa.Column('image_dhash', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('products', 'image_dhash')
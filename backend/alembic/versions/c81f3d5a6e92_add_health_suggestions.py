@@ -0,0 +1,39 @@
+"""add health suggestions
+
+Revision ID: c81f3d5a6e92
+Revises: 5b7e0c4f9a21
+Create Date: 2026-10-18 12:40:52.907316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81f3d5a6e92'
+down_revision: Union[str, None] = '5b7e0c4f9a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('health_suggestions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('health_flags_key', sa.Text(), nullable=False),
+    sa.Column('image_hash', sa.String(length=64), nullable=False),
+    sa.Column('ai_health_summary', sa.Text(), nullable=True),
+    sa.Column('ai_health_conclusion', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('product_id', 'health_flags_key', 'image_hash', name='uq_health_suggestions_product_flags_image')
+    )
+    op.create_index(op.f('ix_health_suggestions_id'), 'health_suggestions', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_health_suggestions_id'), table_name='health_suggestions')
+    op.drop_table('health_suggestions')
@@ -0,0 +1,31 @@
+"""add listing version indexes
+
+Revision ID: d6a1f08c4e52
+Revises: b3e81c5d9f27
+Create Date: 2026-10-18 21:06:12.384507
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6a1f08c4e52'
+down_revision: Union[str, None] = 'b3e81c5d9f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Per-user version stamps for conditional GETs: max(scanned_at) / max(updated_at) from the index alone
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_history_user_id_scanned_at ON history (user_id, scanned_at)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_reviews_user_id_updated_at ON reviews (user_id, updated_at)")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_reviews_user_id_updated_at")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_history_user_id_scanned_at")
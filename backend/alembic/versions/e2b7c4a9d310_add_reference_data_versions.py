@@ -0,0 +1,56 @@
+"""add reference data versions
+
+Revision ID: e2b7c4a9d310
+Revises: d6a1f08c4e52
+Create Date: 2026-10-18 21:48:03.517290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7c4a9d310'
+down_revision: Union[str, None] = 'd6a1f08c4e52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_TABLES = ('badges', 'health_flags')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'reference_data_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.bulk_insert(
+        sa.table('reference_data_versions', sa.column('name', sa.String)),
+        [{'name': table} for table in _TABLES],
+    )
+    # Triggers rather than application code, so rows seeded from the SQL editor are noticed too
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_reference_data_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO reference_data_versions (name, version) VALUES (TG_TABLE_NAME, 1)
+            ON CONFLICT (name) DO UPDATE SET version = reference_data_versions.version + 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in _TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_reference_data_version "
+            f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_reference_data_version()"
+        )
+
+
+def downgrade() -> None:
+    for table in _TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_reference_data_version ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS bump_reference_data_version()")
+    op.drop_table('reference_data_versions')
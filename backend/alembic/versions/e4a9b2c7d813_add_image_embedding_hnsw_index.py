@@ -0,0 +1,36 @@
+"""add image embedding hnsw index
+
+Revision ID: e4a9b2c7d813
+Revises: c81f3d5a6e92
+Create Date: 2026-10-18 13:55:18.274090
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9b2c7d813'
+down_revision: Union[str, None] = 'c81f3d5a6e92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # HNSW over cosine distance (<=>), built without blocking writes to products
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_image_embedding_hnsw "
+            "ON products USING hnsw (image_embedding vector_cosine_ops) "
+            "WITH (m = 16, ef_construction = 64)"
+        )
+    # Per-user similarity search joins the user's history
+    op.create_index('ix_history_user_id_product_id', 'history', ['user_id', 'product_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_history_user_id_product_id', table_name='history')
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_products_image_embedding_hnsw")
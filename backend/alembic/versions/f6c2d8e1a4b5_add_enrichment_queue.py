@@ -0,0 +1,48 @@
+"""add enrichment queue
+
+Revision ID: f6c2d8e1a4b5
+Revises: e4a9b2c7d813
+Create Date: 2026-10-18 15:08:33.452871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c2d8e1a4b5'
+down_revision: Union[str, None] = 'e4a9b2c7d813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('enrichment_status', sa.String(length=20), server_default='ready', nullable=False))
+    op.create_table('enrichment_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('image_data', sa.LargeBinary(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_enrichment_jobs_id'), 'enrichment_jobs', ['id'], unique=False)
+    # Workers poll for claimable jobs
+    op.create_index('ix_enrichment_jobs_status_available_at', 'enrichment_jobs', ['status', 'available_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_enrichment_jobs_status_available_at', table_name='enrichment_jobs')
+    op.drop_index(op.f('ix_enrichment_jobs_id'), table_name='enrichment_jobs')
+    op.drop_table('enrichment_jobs')
+    op.drop_column('products', 'enrichment_status')
@@ -0,0 +1,89 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Product listing (GET /products/)
+PRODUCTS_PAGE_SIZE = int(os.getenv("PRODUCTS_PAGE_SIZE", 50))
+PRODUCTS_MAX_PAGE_SIZE = int(os.getenv("PRODUCTS_MAX_PAGE_SIZE", 200))
+
+# NDJSON streaming of full listings: rows fetched per server-side cursor round trip
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", 500))
+
+# OpenFoodFacts lookups. Point OPEN_FOOD_FACTS_URL at a local stub server in tests.
+OPEN_FOOD_FACTS_URL = os.getenv("OPEN_FOOD_FACTS_URL", "https://world.openfoodfacts.org")
+OPEN_FOOD_FACTS_TIMEOUT = float(os.getenv("OPEN_FOOD_FACTS_TIMEOUT", 5))
+OFF_CACHE_TTL = int(os.getenv("OFF_CACHE_TTL", 7 * 24 * 3600))
+OFF_NEGATIVE_CACHE_TTL = int(os.getenv("OFF_NEGATIVE_CACHE_TTL", 3600))
+OFF_CACHE_MAXSIZE = int(os.getenv("OFF_CACHE_MAXSIZE", 10000))
+
+# AI service / image download HTTP client (shared keep-alive pool per worker)
+AI_SERVICE_URL = os.getenv("AI_SERVICE_URL")
+AI_HTTP2 = os.getenv("AI_HTTP2", "true").lower() == "true"
+AI_CONNECT_TIMEOUT = float(os.getenv("AI_CONNECT_TIMEOUT", 5))
+AI_READ_TIMEOUT = float(os.getenv("AI_READ_TIMEOUT", 60))
+AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", 20))
+AI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("AI_MAX_KEEPALIVE_CONNECTIONS", 10))
+
+# Memoized AI results per uploaded image (keyed by SHA-256 of the decoded bytes)
+IMAGE_MEMO_MAXSIZE = int(os.getenv("IMAGE_MEMO_MAXSIZE", 512))
+
+# Image similarity search (pgvector)
+IMAGE_MATCH_THRESHOLD = float(os.getenv("IMAGE_MATCH_THRESHOLD", 0.2))
+VECTOR_SEARCH_CANDIDATES = int(os.getenv("VECTOR_SEARCH_CANDIDATES", 10))
+VECTOR_HNSW_EF_SEARCH = int(os.getenv("VECTOR_HNSW_EF_SEARCH", 40))
+# "full": search image_embedding directly. "halfvec" / "binary" / "short" (512-dim prefix): pull
+# VECTOR_PREFILTER_CANDIDATES from the compact column's index, then re-rank them at full precision.
+VECTOR_SEARCH_MODE = os.getenv("VECTOR_SEARCH_MODE", "full")
+VECTOR_PREFILTER_CANDIDATES = int(os.getenv("VECTOR_PREFILTER_CANDIDATES", 100))
+
+# Per-user in-memory embedding matrices for "have I scanned this before" lookups
+USER_EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("USER_EMBEDDING_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+USER_EMBEDDING_CACHE_TTL = int(os.getenv("USER_EMBEDDING_CACHE_TTL", 300))
+
+# POST /products/image/batch
+BATCH_SCAN_MAX_IMAGES = int(os.getenv("BATCH_SCAN_MAX_IMAGES", 20))
+BATCH_SCAN_CONCURRENCY = int(os.getenv("BATCH_SCAN_CONCURRENCY", 4))
+
+# Background enrichment of new scans (storage upload + AI calls)
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", 4))
+ENRICHMENT_POLL_INTERVAL = float(os.getenv("ENRICHMENT_POLL_INTERVAL", 2))
+ENRICHMENT_MAX_ATTEMPTS = int(os.getenv("ENRICHMENT_MAX_ATTEMPTS", 3))
+ENRICHMENT_JOB_TIMEOUT = int(os.getenv("ENRICHMENT_JOB_TIMEOUT", 300))
+
+# Product image storage: "supabase", or "s3" for any S3-compatible store (e.g. a local MinIO in tests)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase")
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+IMG_BUCKET_NAME = os.getenv("IMG_BUCKET_NAME")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL", S3_ENDPOINT_URL)
+# Let enrichment finish without waiting for the upload; the URL is content-addressed so it is known up front
+STORAGE_FIRE_AND_FORGET = os.getenv("STORAGE_FIRE_AND_FORGET", "false").lower() == "true"
+
+# Scan image normalization before hashing, AI calls and upload
+IMAGE_NORMALIZE = os.getenv("IMAGE_NORMALIZE", "true").lower() == "true"
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", 1024))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG").upper()  # JPEG or WEBP
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", 85))
+
+# Multipart scan uploads (POST /products/image/upload, /products/health_suggestion/upload)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 10 * 1024 * 1024))
+
+# Global-first image matching: reuse another user's product only on a close match
+GLOBAL_IMAGE_MATCH_THRESHOLD = float(os.getenv("GLOBAL_IMAGE_MATCH_THRESHOLD", 0.12))
+# Offline near-duplicate merge (python -m app.services.product_dedup)
+DEDUP_MATCH_THRESHOLD = float(os.getenv("DEDUP_MATCH_THRESHOLD", 0.08))
+DEDUP_BATCH_SIZE = int(os.getenv("DEDUP_BATCH_SIZE", 200))
+
+# Perceptual-hash (dHash) first stage for image scans: a hit within this many of 64 bits skips the AI call
+PHASH_ENABLED = os.getenv("PHASH_ENABLED", "true").lower() == "true"
+PHASH_MATCH_DISTANCE = int(os.getenv("PHASH_MATCH_DISTANCE", 4))
+PHASH_INDEX_TTL = int(os.getenv("PHASH_INDEX_TTL", 300))
+
+# Cached badges / health flags: how often a worker checks reference_data_versions for writes by others
+REFERENCE_DATA_CHECK_INTERVAL = float(os.getenv("REFERENCE_DATA_CHECK_INTERVAL", 30))
+
+# Authenticated-user records resolved from the token's user_id claim (invalidated on update/delete)
+USER_IDENTITY_CACHE_TTL = int(os.getenv("USER_IDENTITY_CACHE_TTL", 60))
+USER_IDENTITY_CACHE_MAXSIZE = int(os.getenv("USER_IDENTITY_CACHE_MAXSIZE", 10000))
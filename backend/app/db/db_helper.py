@@ -1,8 +1,6 @@
-from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
-from storage3.utils import StorageException
-from app import schemas, models
+from app import schemas, models, services
 from app.db.db_supabase import get_db
 from app.utils.ResponseResult import Response
 from app.utils import response  
@@ -12,7 +10,6 @@ from sqlalchemy import text
 import base64
 import mimetypes
 import requests
-import uuid
 
 
 load_dotenv() 
@@ -22,8 +19,6 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 AI_SERVICE_URL = os.getenv("AI_SERVICE_URL")
 IMG_BUCKET_NAME = os.getenv("IMG_BUCKET_NAME")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 
 # def upload_image_to_bucket(image, bucket_name, file_name):
 #     try:
@@ -76,26 +71,9 @@ def encode_image_to_base64(image_path):
 
 
 
-def generate_unique_filename(extension: str = ".jpg", max_attempts: int = 10) -> str:
-    for _ in range(max_attempts):
-        filename = f"{uuid.uuid4().hex}{extension}"
-        try:
-            # Try to get metadata; if it exists, filename is taken
-            supabase.storage.from_(IMG_BUCKET_NAME).get_metadata(filename)
-        except Exception as e:
-            if "object not found" in str(e).lower():
-                return filename
-    raise Exception("Unable to generate a unique filename after multiple attempts.")
-
 def upload_image_to_bucket(image):
-    try:
-        filename = generate_unique_filename()
-        res = supabase.storage.from_(IMG_BUCKET_NAME).upload(filename, image)
-    except StorageException as e:
-        raise Exception(f"Upload failed: {e.message}")
-
-    public_url = f"{SUPABASE_URL}/storage/v1/object/public/{IMG_BUCKET_NAME}/{filename}"
-    return public_url
+    # Content-addressed names need no "is this filename taken?" metadata round trips
+    return services.upload_image_to_bucket(image)
 
 # def most_similar_img(embedding, db: Session):
 #     threshold = 0.2
@@ -129,74 +107,6 @@ def most_similar_img(embedding, db: Session):
         return models.Product(**result)  # Convert the result to a Product model object
     return None
 
-def get_image_embedding(base64image):
-    # encoded_image = encode_image_to_base64(image_path)
-    payload = {
-        "image": base64image
-    }
-
-    headers = {
-        "Content-Type": "application/json"
-    }
-    response = requests.post(f'{AI_SERVICE_URL}/image-encode', json=payload, headers=headers)
-    if response.ok:
-        # print("Success:", response.json())
-        print("Success on image_encode_endpoint")
-    else:
-        print("Error:", response.status_code, response.text)
-    return response.json()["textDescriptionEmbedding"]
-
-def get_AI_product_info(base64image):
-    payload = {
-        "image": base64image
-    }
-    headers = {
-        "Content-Type": "application/json"
-    }
-    response = requests.post(f'{AI_SERVICE_URL}/product-info', json=payload, headers=headers)
-    if response.ok:
-        # print("Success:", response.json())
-        print("Success on image_encode_endpoint")
-    else:
-        print("Error:", response.status_code, response.text)
-    return response.json()["productName"], response.json()["productManufacturer"], response.json()["productDescription"]
-
-
-"""
-Add-by-image,
-Input:
-base64image: string (this is for user taking picture of FRONT SIDE
-1. Get embedding of query image (photo taken by user) from AI,
-2. Check if similar product exist in the db,
-3-1. If exist: return product information
-3-2. If not: 
-    1) save this image to the bucket and get img_url
-    2) hit AI "Product information" to get product name/manufacturer
-    3) save product information into RDB Products table 
-return: Product information
-"""
-def add_by_image(base64image: str,  db: Session = Depends(get_db)):
-    embedding = get_image_embedding(base64image)
-    product = most_similar_img(embedding, db)
-    
-    if product:
-        print(f"Most similar product id: {product.id}, name: {product.name}")
-        return Response(code=200, data=product, msg="Product fetched successfully")
-    else:
-        image_url = upload_image_to_bucket(base64image)
-        product_name, product_manufacturer, product_description = get_AI_product_info(base64image)
-        product = schemas.ProductCreate(
-            name=product_name,
-            image_url=image_url,
-            image_embedding=embedding,
-            brands=[product_manufacturer]
-        )
-        db_product = models.Product(**product.dict())
-        db.add(db_product)
-        db.commit()
-        return Response(code=200, data=product, msg="Product fetched successfully")
-
-
 """
 # Example usage
 def test_encode_img():
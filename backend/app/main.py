@@ -1,9 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import auth, badges, users, history, products, reviews
+from fastapi.concurrency import run_in_threadpool
+from app.services import close_ai_http_client, start_enrichment_workers, stop_enrichment_workers, load_reference_data
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.upload_limit import UploadSizeLimitMiddleware
+from app.core.config import UPLOAD_MAX_BYTES
 
 app = FastAPI(title="FlavorPal API")
 
+# Multipart scan uploads are rejected before the form parser spools them to disk.
+# Added before CORS so that the 413 still carries CORS headers.
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=UPLOAD_MAX_BYTES, path_suffixes=("/upload",))
+
 # --- CORS Middleware ---
 origins = [
     "http://localhost:5173",
@@ -17,6 +26,7 @@ app.add_middleware(
     allow_credentials=True,    # Allow cookies to be included in requests
     allow_methods=["*"],         # Allow all methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],         # Allow all headers
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],  # Pagination cursor and conditional-GET validators
 )
 
 # Routers
@@ -28,6 +38,18 @@ app.include_router(reviews.router)
 app.include_router(badges.router)
 
 
+@app.on_event("startup")
+async def startup():
+    await run_in_threadpool(load_reference_data)
+    start_enrichment_workers()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_enrichment_workers()
+    await close_ai_http_client()
+
+
 @app.get("/")
 def read_root():
     return {"msg": "Welcome to the API"}
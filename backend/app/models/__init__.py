@@ -5,4 +5,9 @@ from .review import Review
 from .history import History
 from .badge import Badge, UserBadge
 from .healthflag import HealthFlag, UserHealthFlag
-
+from .openfoodfacts import OpenFoodFactsCache
+from .image_ai_result import ImageAIResult
+from .health_suggestion import HealthSuggestion
+from .enrichment_job import EnrichmentJob
+from .maintenance_checkpoint import MaintenanceCheckpoint
+from .reference_data_version import ReferenceDataVersion
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, LargeBinary
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
+from .base import Base
+import datetime
+
+
+class EnrichmentJob(Base):
+    """
+    Durable queue entry for the slow part of a scan (storage upload and AI calls),
+    picked up by the background enrichment workers.
+    """
+    __tablename__ = "enrichment_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey(
+        "products.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSONB, nullable=False, default=dict)
+    # Canonical key of payload["health_flags"], so pending suggestions can be looked up in SQL
+    health_flags_key = Column(Text)
+    image_data = Column(LargeBinary)
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    available_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    started_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    product = relationship("Product", back_populates="enrichment_jobs")
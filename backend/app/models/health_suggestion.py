@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from .base import Base
+import datetime
+
+
+class HealthSuggestion(Base):
+    """
+    An AI health suggestion for one product, one canonical health-flag set and
+    one ingredients image. Users with the same flags share the same row.
+    """
+    __tablename__ = "health_suggestions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey(
+        "products.id", ondelete="CASCADE"), nullable=False)
+    health_flags_key = Column(Text, nullable=False)
+    image_hash = Column(String(64), nullable=False)
+    ai_health_summary = Column(Text)
+    ai_health_conclusion = Column(Text)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('product_id', 'health_flags_key', 'image_hash', name='uq_health_suggestions_product_flags_image'),
+    )
+
+    product = relationship("Product", back_populates="health_suggestions")
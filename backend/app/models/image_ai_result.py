@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, DateTime, Text
+from .base import Base
+import datetime
+from pgvector.sqlalchemy import Vector
+
+
+class ImageAIResult(Base):
+    """AI service results for an uploaded image, keyed by the SHA-256 of its decoded bytes."""
+    __tablename__ = "image_ai_results"
+
+    image_hash = Column(String(64), primary_key=True)
+    image_embedding = Column(Vector(1536))
+    product_name = Column(String(255))
+    product_manufacturer = Column(Text)
+    product_description = Column(Text)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
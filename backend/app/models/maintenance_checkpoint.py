@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from .base import Base
+import datetime
+
+
+class MaintenanceCheckpoint(Base):
+    """Progress of a resumable offline job (e.g. the near-duplicate product merge), by job name."""
+    __tablename__ = "maintenance_checkpoints"
+
+    name = Column(String(100), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
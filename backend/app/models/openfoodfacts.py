@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from .base import Base
+import datetime
+
+
+class OpenFoodFactsCache(Base):
+    """Raw OpenFoodFacts product payloads, including remembered misses (found=False)."""
+    __tablename__ = "openfoodfacts_cache"
+
+    barcode = Column(String(255), primary_key=True)
+    found = Column(Boolean, nullable=False)
+    payload = Column(JSONB)
+    fetched_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
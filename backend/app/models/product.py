@@ -1,27 +1,41 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ARRAY
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, ARRAY, Computed
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from .base import Base
 import datetime
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
 
 
 class Product(Base):
     __tablename__ = "products"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
-    barcode = Column(String(255))
+    barcode = Column(String(255), unique=True, index=True)
     image_url = Column(Text)
+    # 64-bit dHash of the scanned image, for the perceptual-hash first stage
+    image_dhash = Column(BigInteger)
     image_embedding = Column(Vector(1536))
-    last_updated = Column(DateTime, default=datetime.datetime.utcnow)
+    # Compact copies maintained by Postgres, used as ANN prefilters (VECTOR_SEARCH_MODE)
+    image_embedding_half = deferred(Column(HALFVEC(1536), Computed("image_embedding::halfvec(1536)", persisted=True)))
+    image_embedding_bits = deferred(Column(BIT(1536), Computed("binary_quantize(image_embedding)::bit(1536)", persisted=True)))
+    # Renormalized 512-dim prefix (Matryoshka truncation), see truncate_embedding()
+    image_embedding_short = deferred(Column(Vector(512), Computed("l2_normalize(subvector(image_embedding, 1, 512))::vector(512)", persisted=True)))
+    # NOT NULL: it is the keyset of the product listing
+    last_updated = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
     generic_name = Column(String(255))
     ingredients = Column(Text)
     categories = Column(Text)
     brands = Column(Text)
     ai_health_summary = Column(Text)
     ai_health_conclusion = Column(Text)
+    # "ready", or "enriching"/"failed" while background enrichment is pending or gave up
+    enrichment_status = Column(String(20), nullable=False, default="ready", server_default="ready")
 
     reviews = relationship(
         "Review", back_populates="product", cascade="all, delete-orphan")
     history = relationship(
         "History", back_populates="product", cascade="all, delete-orphan")
+    health_suggestions = relationship(
+        "HealthSuggestion", back_populates="product", cascade="all, delete-orphan")
+    enrichment_jobs = relationship(
+        "EnrichmentJob", back_populates="product", cascade="all, delete-orphan")
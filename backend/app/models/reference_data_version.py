@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, BigInteger
+from .base import Base
+
+
+class ReferenceDataVersion(Base):
+    """
+    Change counter of a small reference table (badges, health_flags), bumped by a statement
+    trigger on every write to it. Workers poll it to know when to reload their cached copy.
+    """
+    __tablename__ = "reference_data_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
@@ -1,16 +1,21 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi import Response as FastAPIResponse
 from sqlalchemy.orm import Session
-from app import schemas, models
+from app import schemas, models, services
 from app.db.db import get_db
 from typing import List
-from app.utils import response
+from app.utils import response, conditional
 from app.utils.ResponseResult import Response
 from app.utils.dependencies import get_current_user
 
 router = APIRouter(prefix="/badges", tags=["Badges"])
 
 @router.get("/", response_model=Response[List[schemas.UserBadgeFrontend]])
-def get_current_user_badges(current_user: models.User = Depends(get_current_user)):
+def get_current_user_badges(request: Request, http_response: FastAPIResponse, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    version = services.badge_list_version(db, current_user.id)
+    unchanged = conditional.not_modified(request, version)
+    if unchanged is not None:
+        return unchanged
     user_badges = [
         schemas.UserBadgeFrontend(
             badge=user_badge.badge,
@@ -19,11 +24,12 @@ def get_current_user_badges(current_user: models.User = Depends(get_current_user
     ];
     if not current_user:
         raise response.not_found(msg="User not found",code=404)
+    http_response.headers.update(version.headers())
     return Response(code=200, data=user_badges, msg="User badges fetched successfully")
 
 @router.get("/all", response_model=Response[List[schemas.Badge]])
 def get_all_badges(db: Session = Depends(get_db)):
-    badges = db.query(models.Badge).all()
+    badges = services.reference_data.get(db).badges
     return Response(code=200, data=badges, msg="All badges fetched successfully")
 
 @router.patch("/update/{badge_id}", response_model=Response[schemas.UserBadgeFrontend])
@@ -1,25 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from app import models, schemas
-from app.db.db import get_db
+from app import models, schemas, services
+from app.db.db import get_db, SessionLocal
 from typing import List
-from app.utils import response
+from app.utils import response, streaming
 from app.utils.ResponseResult import Response
 router = APIRouter(
     prefix="/history",
     tags=["History"]
 )
 
+def _history_out(history: models.History) -> schemas.HistoryOut:
+    return schemas.HistoryOut(
+        id=history.id,
+        productId=history.product_id,
+        scannedAt=history.scanned_at,
+    )
+
+
 @router.get("/", response_model=Response[List[schemas.HistoryOut]])
-def get_all_history(db: Session = Depends(get_db)):
+def get_all_history(request: Request, stream: bool = False, db: Session = Depends(get_db)):
+    """
+    Lists every history record. With `?stream=true` or `Accept: application/x-ndjson`
+    the records are streamed as NDJSON instead of being collected into one response.
+    """
+    if streaming.wants_ndjson(request, stream):
+        return streaming.ndjson_response(
+            SessionLocal,
+            lambda stream_db: stream_db.query(models.History).order_by(models.History.id),
+            _history_out,
+        )
     histories = db.query(models.History).all()
-    history_list = []
-    for history in histories:
-        history_list.append(schemas.HistoryOut(
-            id=history.id,
-            productId=history.product.id,
-            scannedAt=history.scanned_at,
-        )) 
+    history_list = [_history_out(history) for history in histories]
     return Response(code=200, data=history_list, msg="History fetched successfully")
 
 @router.get("users/{user_id}/", response_model=Response[List[schemas.HistoryOut]])
@@ -35,11 +47,13 @@ def create_user_history(user_id: int, product_id: int,history: schemas.HistoryCr
     history = models.History(**history.dict(), user_id=user_id, product_id=product_id)
     db.add(history)
     db.commit()
+    services.user_embedding_cache.invalidate(user_id)
     return Response(code=200, data=history, msg="History created successfully")
 
 @router.delete("/users/{user_id}/", status_code=204)
 def delete_user_history(user_id: int, db: Session = Depends(get_db)):
     db.query(models.History).filter(models.History.user_id == user_id).delete()
     db.commit()
+    services.user_embedding_cache.invalidate(user_id)
     return Response(code=200, msg="History deleted successfully")
 
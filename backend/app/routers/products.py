@@ -1,105 +1,197 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, aliased
 from app import models, schemas, services
-from app.db.db_supabase import get_db
-from typing import List
-from app.utils import response 
+from app.core.config import PRODUCTS_PAGE_SIZE, PRODUCTS_MAX_PAGE_SIZE, BATCH_SCAN_MAX_IMAGES, BATCH_SCAN_CONCURRENCY, GLOBAL_IMAGE_MATCH_THRESHOLD, PHASH_ENABLED
+from app.db.db_supabase import get_db, SessionLocal
+from typing import List, Optional
+from app.utils import response, pagination, streaming, conditional
 from app.utils.ResponseResult import Response
+from app.utils.fast_json import fast_response
 from app.utils.dependencies import get_current_user
-import requests
+from app.utils.singleflight import SingleFlight
 from datetime import datetime
+import asyncio
 import json
 router = APIRouter(
     prefix="/products",
     tags=["Products"]
 )
 
+# Concurrent scans of the same barcode wait on one OpenFoodFacts lookup and product insert
+_barcode_flight = SingleFlight()
 
 
+# Small blocking DB helpers, called through run_in_threadpool from the async scan handlers
+def _is_in_history(db: Session, product_id: int, user_id: int) -> bool:
+    return db.query(models.History).filter(models.History.product_id == product_id, models.History.user_id == user_id).first() is not None
+
+
+def _user_review(db: Session, product_id: int, user_id: int) -> models.Review | None:
+    return db.query(models.Review).filter(models.Review.product_id == product_id, models.Review.user_id == user_id).first()
+
+
+def _health_flag_names(user: models.User, db: Session) -> list[str]:
+    return services.health_flag_names_for(user, db)
+
+
+
+
+def _add_to_history(db: Session, product: models.Product, user_id: int, commit: bool = True) -> bool:
+    """
+    Adds the product to the user's history unless it is there already; returns whether it was added.
+    With commit=False the row is only added to the session, and the caller commits and then
+    updates the user's embedding cache.
+    """
+    if _is_in_history(db, product.id, user_id):
+        return False
+    db.add(models.History(product_id=product.id, user_id=user_id, scanned_at=datetime.utcnow()))
+    if commit:
+        db.commit()
+        services.user_embedding_cache.add(user_id, product.id, product.image_embedding)
+    return True
+
+
+def _link_global_match(db: Session, embedding, user_id: int) -> models.Product | None:
+    """
+    Looks for a product any user has scanned that matches within GLOBAL_IMAGE_MATCH_THRESHOLD
+    and links it into the user's history, instead of creating a duplicate product.
+    """
+    product = services.most_similar_img(embedding, db, GLOBAL_IMAGE_MATCH_THRESHOLD)
+    if product is None:
+        return None
+    _add_to_history(db, product, user_id)
+    return product
+
+
+def _product_details(product: models.Product, review: models.Review | None, suggestion: models.HealthSuggestion | None):
+    """Frontend product details with the AI health fields of the user's own flag set, when stored."""
+    return services.generate_ProductDetailsFrontend(
+        product, review,
+        summary=suggestion.ai_health_summary if suggestion else None,
+        conclusion=suggestion.ai_health_conclusion if suggestion else None,
+    )
+
+
+def _user_product_details(db: Session, product: models.Product, user: models.User):
+    """Details of one product as the given user sees it: their review and their flag set's suggestion."""
+    review = _user_review(db, product.id, user.id)
+    suggestion = services.find_health_suggestion(db, product.id, services.health_flags_key(_health_flag_names(user, db)))
+    return _product_details(product, review, suggestion)
+
+
+def _phash_match(db: Session, image: services.PreparedImage, user_id: int) -> models.Product | None:
+    """
+    Recognizes a near-identical photo of a known product (the user's or anyone's) by its
+    perceptual hash alone. Ambiguous or unknown photos return None and go to the AI path.
+    """
+    if image.dhash is None:
+        return None
+    product_id = services.phash_index.match(image.dhash, db)
+    if product_id is None:
+        return None
+    product = db.query(models.Product).filter(models.Product.id == product_id).first()
+    # Deleted (e.g. merged away) since the index was loaded
+    if product is None:
+        return None
+    _add_to_history(db, product, user_id)
+    return product
+
+
+def _products_with_user_review(db: Session, user_id: int, flags_key: str, cursor: Optional[tuple[datetime, int]] = None):
+    """
+    Builds the newest-first product listing query, outer-joined with the given
+    user's review and the newest health suggestion for their flag set, so that
+    each row is a (Product, Review | None, HealthSuggestion | None) triple.
+    """
+    # At most one review per product for this user, so the join cannot duplicate products
+    user_reviews = (
+        db.query(models.Review)
+        .filter(models.Review.user_id == user_id)
+        .distinct(models.Review.product_id)
+        .order_by(models.Review.product_id, models.Review.id)
+        .subquery()
+    )
+    user_review = aliased(models.Review, user_reviews)
+    flag_suggestions = (
+        db.query(models.HealthSuggestion)
+        .filter(models.HealthSuggestion.health_flags_key == flags_key)
+        .distinct(models.HealthSuggestion.product_id)
+        .order_by(models.HealthSuggestion.product_id, models.HealthSuggestion.created_at.desc())
+        .subquery()
+    )
+    flag_suggestion = aliased(models.HealthSuggestion, flag_suggestions)
+    query = (
+        db.query(models.Product, user_review, flag_suggestion)
+        .outerjoin(user_review, user_review.product_id == models.Product.id)
+        .outerjoin(flag_suggestion, flag_suggestion.product_id == models.Product.id)
+        .order_by(models.Product.last_updated.desc(), models.Product.id.desc())
+    )
+    if cursor:
+        last_updated, last_id = cursor
+        query = query.filter(tuple_(models.Product.last_updated, models.Product.id) < tuple_(last_updated, last_id))
+    return query
+
 
 @router.get("/",response_model=Response[List[schemas.ProductDetailsFrontend]])
-def get_all_products(db: Session = Depends(get_db),current_user: models.User = Depends(get_current_user)):
-    products = db.query(models.Product).all()
-    user_id = current_user.id
-    product_details = []
-    for product in products:
-        review = db.query(models.Review).filter(models.Review.product_id == product.id, models.Review.user_id == user_id).first()
-        if review:
-            product_info = schemas.ProductDetailsFrontend(
-                id=product.id,
-                name=product.name,
-                brands=product.brands if product.brands else "Unknown",
-                barcode=product.barcode,
-                imageUrl=product.image_url,
-                categories=product.categories if product.categories else "Unknown",
-                isReviewed=True,
-                userRating=review.rating,
-                userNotes=review.note,
-                aiHealthSummary=product.ai_health_summary if product.ai_health_summary else "The image does not contain a product ingredient table to analyze for dietary preferences.",
-                aiHealthConclusion=product.ai_health_conclusion if product.ai_health_conclusion else "unknown",
-                dateScanned=product.last_updated.strftime("%Y-%m-%d, %H:%M:%S"),
-                dateReviewed=review.updated_at.strftime("%Y-%m-%d, %H:%M:%S")
-            )
-        else:
-            product_info = schemas.ProductDetailsFrontend(
-                id=product.id,
-                name=product.name,
-                brands=product.brands if product.brands else "Unknown",
-                barcode=product.barcode,
-                imageUrl=product.image_url,
-                categories=product.categories if product.categories else "Unknown",
-                isReviewed=False,
-                userRating=None,
-                userNotes=None,
-                aiHealthSummary=product.ai_health_summary if product.ai_health_summary else "The image does not contain a product ingredient table to analyze for dietary preferences.",
-                aiHealthConclusion=product.ai_health_conclusion if product.ai_health_conclusion else "unknown",
-                dateScanned=product.last_updated.strftime("%Y-%m-%d, %H:%M:%S"),
-                dateReviewed=None
-            )
-        product_details.append(product_info)
-    return Response(code=200, data=product_details, msg="Products fetched successfully")
+def get_all_products(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(PRODUCTS_PAGE_SIZE, ge=1, le=PRODUCTS_MAX_PAGE_SIZE),
+    stream: bool = False,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Lists products newest first, one keyset page at a time.
+    The current user's review is joined in the same query; the cursor for the
+    next page is returned in the X-Next-Cursor header (absent on the last page).
+    With `?stream=true` or `Accept: application/x-ndjson` the whole catalog from
+    the cursor onwards is streamed as NDJSON instead.
+    """
+    after = None
+    if cursor:
+        try:
+            after = pagination.decode_cursor(cursor)
+        except ValueError:
+            return response.error(msg="Invalid cursor", code=400)
+
+    flags_key = services.health_flags_key(_health_flag_names(current_user, db))
+    if streaming.wants_ndjson(request, stream):
+        user_id = current_user.id
+        return streaming.ndjson_response(
+            SessionLocal,
+            lambda stream_db: _products_with_user_review(stream_db, user_id, flags_key, after),
+            lambda row: _product_details(*row),
+        )
+
+    rows = _products_with_user_review(db, current_user.id, flags_key, after).limit(limit + 1).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_product = rows[-1][0]
+        headers[pagination.NEXT_CURSOR_HEADER] = pagination.encode_cursor(last_product.last_updated, last_product.id)
+
+    product_details = [_product_details(product, review, suggestion) for product, review, suggestion in rows]
+    return fast_response(product_details, "Products fetched successfully", headers=headers)
     
 @router.get("/{product_id}", response_model=Response[schemas.ProductDetailsFrontend])
 def get_product(product_id: int, db: Session = Depends(get_db),current_user: models.User = Depends(get_current_user)):
     product = db.query(models.Product).filter(models.Product.id == product_id).first()
     if not product:
         return response.not_found(msg="Product not found",code=404)
-    user_id = current_user.id
-    review = db.query(models.Review).filter(models.Review.product_id == product_id, models.Review.user_id == user_id).first()
-    product_details = None
-    if review:
-        product_details = schemas.ProductDetailsFrontend(
-            id=product.id,
-            name=product.name,
-            brands=product.brands if product.brands else "Unknown",
-            barcode=product.barcode,
-            imageUrl=product.image_url,
-            categories=product.categories if product.categories else "Unknown",
-            isReviewed=True,
-            userRating=review.rating,
-            userNotes=review.note,
-            aiHealthSummary=product.ai_health_summary if product.ai_health_summary else "The image does not contain a product ingredient table to analyze for dietary preferences.",
-            aiHealthConclusion=product.ai_health_conclusion if product.ai_health_conclusion else "unknown",
-            dateScanned=product.last_updated.strftime("%Y-%m-%d, %H:%M:%S"),
-            dateReviewed=review.updated_at.strftime("%Y-%m-%d, %H:%M:%S")
-        )
-    else:
-        product_details = schemas.ProductDetailsFrontend(
-            id=product.id,
-            name=product.name,
-            brands=product.brands if product.brands else "Unknown",
-            barcode=product.barcode,
-            imageUrl=product.image_url,
-            categories=product.categories if product.categories else "Unknown",
-            isReviewed=False,
-            userRating=None,
-            userNotes=None,
-            aiHealthSummary=product.ai_health_summary if product.ai_health_summary else "The image does not contain a product ingredient table to analyze for dietary preferences.",
-            aiHealthConclusion=product.ai_health_conclusion if product.ai_health_conclusion else "unknown",
-            dateScanned=product.last_updated.strftime("%Y-%m-%d, %H:%M:%S"),
-            dateReviewed=None
-        )
-    return Response(code=200, data=product_details, msg="Product fetched successfully")
+    product_details = _user_product_details(db, product, current_user)
+    return fast_response(product_details, "Product fetched successfully")
+
+@router.get("/{product_id}/status", response_model=Response[schemas.ProductEnrichmentStatus])
+def get_product_enrichment_status(product_id: int, db: Session = Depends(get_db), _: models.User = Depends(get_current_user)):
+    """Cheap polling endpoint for scans that are still being enriched in the background."""
+    status = db.query(models.Product.enrichment_status).filter(models.Product.id == product_id).scalar()
+    if status is None:
+        return response.not_found(msg="Product not found", code=404)
+    return Response(code=200, data=schemas.ProductEnrichmentStatus(productId=product_id, enrichmentStatus=status), msg="Product status fetched successfully")
 
 @router.post("/", response_model=Response[schemas.ProductOut])
 def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
@@ -130,94 +222,254 @@ def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)
     return Response(code=200, data=product_info, msg="Product created successfully")
 
 @router.post("/image", response_model=Response[schemas.ProductDetailsFrontend])
-def add_by_image(
+async def add_by_image(
     request: schemas.ProductImageRequest,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    base64image = request.base64image
-    embedding = services.get_image_embedding(base64image)
-    # product = services.most_similar_img(embedding, db)
-    product = services.most_similar_img_for_user(embedding, current_user.id, db)
+    try:
+        # Decoded and downscaled once; every later step reuses the normalized bytes
+        image = await run_in_threadpool(services.prepare_base64_image, request.base64image)
+    except ValueError as e:
+        return response.error(msg=str(e), code=400)
+    return await _scan_image(image, db, current_user)
+
+
+@router.post("/image/upload", response_model=Response[schemas.ProductDetailsFrontend])
+async def add_by_image_upload(
+    image: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Same as POST /products/image, but takes the photo as a multipart file instead of
+    base64 JSON. The upload is spooled to a temp file and decoded from there.
+    """
+    try:
+        prepared = await run_in_threadpool(services.prepare_image_file, image.file, image.content_type or "image/jpeg")
+    except ValueError as e:
+        return response.error(msg=str(e), code=400)
+    finally:
+        await image.close()
+    return await _scan_image(prepared, db, current_user)
+
+
+async def _scan_image(image: services.PreparedImage, db: Session, current_user: models.User):
+    user_id = current_user.id
+    if PHASH_ENABLED:
+        # Near-identical photo of a known product: answered without any AI call
+        product = await run_in_threadpool(_phash_match, db, image, user_id)
+        if product is not None:
+            product_details = await run_in_threadpool(_user_product_details, db, product, current_user)
+            return fast_response(product_details, "Product fetched successfully")
+
+    image_hash = image.hash
+    embedding = await services.get_image_embedding_memo(image_hash, image.data_uri, db)
+    product = await run_in_threadpool(services.most_similar_img_for_user_cached, embedding, user_id, db)
+    if product is None:
+        # New to this user: reuse a close enough product someone else already scanned
+        product = await run_in_threadpool(_link_global_match, db, embedding, user_id)
     
     is_in_history = False
     if product:
-        is_in_history = db.query(models.History).filter(models.History.product_id == product.id, models.History.user_id == current_user.id).first() is not None
+        is_in_history = await run_in_threadpool(_is_in_history, db, product.id, user_id)
     
     if product and is_in_history:
         print("product found in DB?")
         print(f"Most similar product id: {product.id}, name: {product.name}")
-        user_id = current_user.id
-        review = db.query(models.Review).filter(models.Review.product_id == product.id, models.Review.user_id == user_id).first()
-        product_details = services.generate_ProductDetailsFrontend(product, review)
-        return Response(code=200, data=product_details, msg="Product fetched successfully")
+        product_details = await run_in_threadpool(_user_product_details, db, product, current_user)
+        return fast_response(product_details, "Product fetched successfully")
     else:
-        image_url = services.upload_image_to_bucket(base64image)
-        product_name, product_manufacturer, product_description = services.get_AI_product_info(base64image)
-        
-        db_product = models.Product(
-            name=product_name,
-            image_url=image_url,
-            image_embedding=embedding,
-            brands=product_manufacturer,
-            ai_health_summary=product_description,
-            ai_health_conclusion="unknown",
-        )
-        db.add(db_product)
-        db.commit()
-        db.refresh(db_product)
-        
-        if not is_in_history:
-            history = models.History(
-                product_id=db_product.id,
-                user_id=current_user.id,
-                scanned_at=datetime.utcnow()
+        # Only the embedding lookup is paid inline; upload and product info are enriched in the background
+        def save_product():
+            db_product = models.Product(
+                name=services.PENDING_PRODUCT_NAME,
+                # Content-addressed, so the URL is known before the upload has happened
+                image_url=services.image_public_url(image.data, image.mime_type),
+                image_dhash=image.dhash,
+                image_embedding=embedding,
+                ai_health_conclusion="unknown",
             )
-            db.add(history)
-            db.commit()
+            db.add(db_product)
+            services.enqueue_enrichment(
+                db, db_product, services.ENRICH_IMAGE_PRODUCT,
+                {"image_hash": image_hash, "mime_type": image.mime_type},
+                image_data=image.data,
+            )
+            db.flush()
             
-        product_details = schemas.ProductDetailsFrontend(
-            id=db_product.id,
-            name=db_product.name,
-            brands=product_manufacturer,
-            barcode=db_product.barcode,
-            imageUrl=image_url,
-            categories=None,
-            isReviewed=False,
-            userRating=None,
-            userNotes=None,
-            aiHealthSummary=product_description,
-            aiHealthConclusion="unknown",
-            dateScanned=db_product.last_updated.strftime("%Y-%m-%d, %H:%M:%S"),
-            dateReviewed=None
+            if not is_in_history:
+                history = models.History(
+                    product_id=db_product.id,
+                    user_id=user_id,
+                    scanned_at=datetime.utcnow()
+                )
+                db.add(history)
+            db.commit()
+            db.refresh(db_product)
+            if not is_in_history:
+                services.user_embedding_cache.add(user_id, db_product.id, embedding)
+            services.phash_index.add(db_product.id, db_product.image_dhash)
+            return db_product
+
+        db_product = await run_in_threadpool(save_product)
+        product_details = services.generate_ProductDetailsFrontend(db_product, None)
+        return fast_response(product_details, "Product is being recognized")
+
+
+@router.post("/image/batch", response_model=Response[List[schemas.ProductImageBatchItem]])
+async def add_by_image_batch(
+    request: schemas.ProductImageBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Recognizes several product photos in one call (e.g. a shelf or a shopping haul).
+    Embeddings run concurrently, bounded by BATCH_SCAN_CONCURRENCY; the history match and
+    the catalog match for the images the user has not scanned are one batched lookup each. Unknown products are created right
+    away and enriched in the background. Each item carries either its product or its own error.
+    """
+    images = request.base64images
+    if len(images) > BATCH_SCAN_MAX_IMAGES:
+        return response.error(msg=f"At most {BATCH_SCAN_MAX_IMAGES} images per batch", code=400)
+    user_id = current_user.id
+    semaphore = asyncio.Semaphore(BATCH_SCAN_CONCURRENCY)
+    errors: dict[int, str] = {}
+
+    async def prepare(image):
+        try:
+            return await run_in_threadpool(services.prepare_base64_image, image)
+        except ValueError as e:
+            return e
+
+    prepared = await asyncio.gather(*(prepare(image) for image in images))
+
+    # Identical photos in one batch are processed once
+    hashes = []
+    unique = {}
+    for index, image in enumerate(prepared):
+        if isinstance(image, ValueError):
+            errors[index] = str(image)
+            image_hash = None
+        else:
+            image_hash = image.hash
+        hashes.append(image_hash)
+        if image_hash is not None:
+            unique.setdefault(image_hash, index)
+
+    # Each concurrent task gets its own session; a Session must not be shared across threads
+    async def embed(image_hash, index):
+        async with semaphore:
+            with SessionLocal() as item_db:
+                return await services.get_image_embedding_memo(image_hash, prepared[index].data_uri, item_db)
+
+    outcomes = await asyncio.gather(*(embed(h, i) for h, i in unique.items()), return_exceptions=True)
+    embeddings = {}
+    for (image_hash, index), outcome in zip(unique.items(), outcomes):
+        if isinstance(outcome, Exception):
+            errors[index] = f"Image recognition failed: {outcome}"
+        else:
+            embeddings[image_hash] = outcome
+
+    embedded_hashes = list(embeddings)
+    matched = await run_in_threadpool(
+        services.most_similar_imgs_for_user_cached, [embeddings[h] for h in embedded_hashes], user_id, db
+    )
+    products = {h: product for h, product in zip(embedded_hashes, matched) if product is not None}
+    new_hashes = [h for h in embedded_hashes if h not in products]
+
+    def save_products():
+        # One catalog lookup for all new images, before anything is added, so the matches'
+        # History rows, the new products and their History rows are written by the single commit below
+        global_matches = dict(zip(new_hashes, services.most_similar_imgs(
+            [embeddings[h] for h in new_hashes], db, GLOBAL_IMAGE_MATCH_THRESHOLD
+        )))
+        linked = {}
+        created = {}
+        for image_hash in new_hashes:
+            match = global_matches[image_hash]
+            if match is not None:
+                products[image_hash] = match
+                if match.id not in linked and _add_to_history(db, match, user_id, commit=False):
+                    linked[match.id] = match
+                continue
+            image = prepared[unique[image_hash]]
+            product = models.Product(
+                name=services.PENDING_PRODUCT_NAME,
+                image_url=services.image_public_url(image.data, image.mime_type),
+                image_dhash=image.dhash,
+                image_embedding=embeddings[image_hash],
+                ai_health_conclusion="unknown",
+            )
+            db.add(product)
+            services.enqueue_enrichment(
+                db, product, services.ENRICH_IMAGE_PRODUCT,
+                {"image_hash": image_hash, "mime_type": image.mime_type},
+                image_data=image.data,
+            )
+            created[image_hash] = product
+        db.flush()
+        db.add_all(
+            models.History(product_id=product.id, user_id=user_id, scanned_at=datetime.utcnow())
+            for product in created.values()
         )
-        return Response(code=200, data=product_details, msg="Product fetched successfully")
+        db.commit()
+        for product in linked.values():
+            services.user_embedding_cache.add(user_id, product.id, product.image_embedding)
+        for image_hash, product in created.items():
+            db.refresh(product)
+            services.user_embedding_cache.add(user_id, product.id, embeddings[image_hash])
+            services.phash_index.add(product.id, product.image_dhash)
+
+        reviews = {}
+        suggestions = {}
+        if products:
+            product_ids = [product.id for product in products.values()]
+            rows = db.query(models.Review).filter(
+                models.Review.product_id.in_(product_ids),
+                models.Review.user_id == user_id,
+            ).all()
+            reviews = {review.product_id: review for review in rows}
+            suggestions = services.find_health_suggestions(
+                db, product_ids, services.health_flags_key(_health_flag_names(current_user, db))
+            )
+        return created, reviews, suggestions
+
+    created, reviews, suggestions = await run_in_threadpool(save_products)
+
+    items = []
+    for index, image_hash in enumerate(hashes):
+        first = unique.get(image_hash, index)
+        if first in errors:
+            items.append(schemas.ProductImageBatchItem(index=index, error=errors[first]))
+        elif image_hash in products:
+            product = products[image_hash]
+            items.append(schemas.ProductImageBatchItem(
+                index=index, product=_product_details(product, reviews.get(product.id), suggestions.get(product.id))
+            ))
+        else:
+            items.append(schemas.ProductImageBatchItem(
+                index=index, product=services.generate_ProductDetailsFrontend(created[image_hash], None)
+            ))
+    return fast_response(items, "Products fetched successfully")
 
 
 @router.get("/currentuser/list/products", response_model=Response[List[schemas.ProductDetailsFrontend]])
-def get_current_user_products(db: Session = Depends(get_db),current_user: models.User = Depends(get_current_user)):
+def get_current_user_products(request: Request, db: Session = Depends(get_db),current_user: models.User = Depends(get_current_user)):
+    flags_key = services.health_flags_key(_health_flag_names(current_user, db))
+    version = services.product_list_version(db, current_user.id, flags_key)
+    unchanged = conditional.not_modified(request, version)
+    if unchanged is not None:
+        return unchanged
     history = db.query(models.History).filter(models.History.user_id == current_user.id).all()
+    suggestions = services.find_health_suggestions(db, [record.product_id for record in history], flags_key)
     product_details = []
     for record in history:
         product = record.product
         review = db.query(models.Review).filter(models.Review.product_id == product.id, models.Review.user_id == current_user.id).first()
-        product_details.append(schemas.ProductDetailsFrontend(
-            id=product.id,
-            name=product.name,
-            brands=product.brands if product.brands else "Unknown",
-            barcode=product.barcode,
-            imageUrl=product.image_url,
-            categories=product.categories if product.categories else "Unknown",
-            isReviewed=bool(review),
-            userRating=review.rating if review else None,
-            userNotes=review.note if review else None,
-            aiHealthSummary=product.ai_health_summary if product.ai_health_summary else "The image does not contain a product ingredient table to analyze for dietary preferences.",
-            aiHealthConclusion=product.ai_health_conclusion if product.ai_health_conclusion else "unknown",
-            dateScanned=product.last_updated.strftime("%Y-%m-%d, %H:%M:%S"),
-            dateReviewed=review.updated_at.strftime("%Y-%m-%d, %H:%M:%S") if review else None
-        ))
-    
-    return Response(code=200, data=product_details, msg="Products fetched successfully")
+        product_details.append(_product_details(product, review, suggestions.get(product.id)))
+
+    return fast_response(product_details, "Products fetched successfully", headers=version.headers())
 
 # @router.patch("/{product_id}", response_model=Response[schemas.ProductOut])
 # def update_product(product_id: int, product: schemas.ProductUpdate, db: Session = Depends(get_db)):
@@ -238,171 +490,205 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
     db.commit()
     return Response(code=200,data=None, msg="Product deleted successfully")
 
+@router.get("/openfoodfacts/cache_stats")
+def get_openfoodfacts_cache_stats(_: models.User = Depends(get_current_user)):
+    return Response(code=200, data=services.off_cache_stats(), msg="OpenFoodFacts cache stats fetched successfully")
+
 @router.get("/product/{barcode}", response_model=Response[schemas.ProductDetailsThroughBarcodeOut])
-def get_product_by_barcode(
+async def get_product_by_barcode(
     barcode: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    # First check if product exists in database
-    product = db.query(models.Product).filter(models.Product.barcode == barcode).first()
-    is_in_history = False
-    
-    # Check if product is in history
-    if product:
-        is_in_history = db.query(models.History).filter(models.History.product_id == product.id, models.History.user_id == current_user.id).first() is not None
-        
-    if product and is_in_history:
-        # Get user's review if exists
-        review = db.query(models.Review).filter(
-            models.Review.product_id == product.id, 
-            models.Review.user_id == current_user.id
-        ).first()
-        
-        product_info = schemas.ProductDetailsThroughBarcodeOut(
-            id=product.id,
-            name=product.name,
-            barcode=barcode,
-            brands=product.brands if product.brands else "Unknown",
-            categories=product.categories if product.categories else "Unknown",
-            imageUrl = product.image_url,
-            # imageIngredientsUrl = None,
-            # imageNutritionUrl = None,
-            isReviewed = review is not None,
-            dateScanned = product.last_updated.strftime("%Y-%m-%d, %H:%M:%S"),
-            likesCount = review.likes_count if review else 0,
-            aiHealthSummary = product.ai_health_summary if product.ai_health_summary else "The image does not contain a product ingredient table to analyze for dietary preferences.",
-            aiHealthConclusion = product.ai_health_conclusion if product.ai_health_conclusion else "unknown",
-        )
+    user_id = current_user.id
+
+    def find_product():
+        health_flags = _health_flag_names(current_user, db)
+        # First check if the product is known to the catalog (scanned by anyone before)
+        product = db.query(models.Product).filter(models.Product.barcode == barcode).first()
+        if product is None:
+            return None, None, None, health_flags
+
+        review = None
+        suggestion = services.find_health_suggestion(db, product.id, services.health_flags_key(health_flags))
+        if _is_in_history(db, product.id, user_id):
+            review = _user_review(db, product.id, user_id)
+        else:
+            # Known product, new to this user: only the history row (and a missing
+            # suggestion for this user's health flags) is new, no re-enrichment
+            db.add(models.History(product_id=product.id, user_id=user_id, scanned_at=datetime.utcnow()))
+            if suggestion is None and health_flags:
+                _queue_health_suggestion(db, product, user_id, health_flags)
+            db.commit()
+            db.refresh(product)
+            services.user_embedding_cache.add(user_id, product.id, product.image_embedding)
+        return product, review, suggestion, health_flags
+
+    product, review, suggestion, health_flags = await run_in_threadpool(find_product)
         
-        return Response(
-            code=200,
-            data=product_info,
-            msg="Product fetched successfully"
+    if product:
+        product_info = services.generate_ProductDetailsThroughBarcode(
+            product, review,
+            summary=suggestion.ai_health_summary if suggestion else None,
+            conclusion=suggestion.ai_health_conclusion if suggestion else None,
         )
+        return fast_response(product_info, "Product fetched successfully")
 
-    # If product not in DB, fetch from OpenFoodFacts
-    OPEN_FOOD_FACTS_URL = f"https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
-    response_off = requests.get(OPEN_FOOD_FACTS_URL)
-    
-    if response_off.status_code != 200:
+    # If product not in DB, fetch from OpenFoodFacts (through the OFF cache).
+    # Concurrent scans of the same barcode share one lookup and one insert.
+    created = await _barcode_flight.do(barcode, lambda: _create_barcode_product(barcode, user_id, health_flags))
+    if created is None:
         return response.not_found(msg="Product not found", code=404)
-    
-    data = response_off.json()
-    product_data = data.get("product", {})
-    
-    if not product_data:
-        return response.not_found(msg="Product not found", code=404)
-    
-    # Process OpenFoodFacts data
-    image_url = product_data.get("image_url")
-    image_ingredients_url = product_data.get("image_ingredients_url")
-    image_nutrition_url = product_data.get("image_nutrition_url")
-    brands = product_data.get("brands") if product_data.get("brands") else "Unknown"
-    categories = product_data.get("categories") if product_data.get("categories") else "Unknown"
-    
-    # Get AI health analysis if ingredients image available
-    conclusion = "unknown"
-    summary = "The image does not contain a product ingredient table to analyze for dietary preferences."
-    
-    if image_url:
-        image_base64 = services.image_url_to_base64(image_url)
-        embedding = services.get_image_embedding(image_base64)
-        
-    if image_ingredients_url:
-        base64_image = services.image_url_to_base64(image_ingredients_url)
-        health_flags = [flag.health_flag.name for flag in current_user.user_health_flags]
-        conclusion, summary = services.get_AI_health_suggestion(base64_image, health_flags)
-
-    # Create new product in database
-    new_product = models.Product(
-        barcode=barcode,
-        image_url=image_url,
-        name=product_data.get("product_name"),
-        generic_name=product_data.get("generic_name"),
-        ingredients=json.dumps(product_data.get("ingredients")),
-        image_embedding=embedding,
-        categories=categories,
-        brands=brands,
-        ai_health_summary=summary,
-        ai_health_conclusion=conclusion,
-        last_updated=datetime.utcnow()
-    )
-    db.add(new_product)
-    db.commit()
-    db.refresh(new_product)
-    
-    # Add to user's scan history
-    if not is_in_history:
-        history = models.History(
-            product_id=new_product.id,
-            user_id=current_user.id,
-            scanned_at=datetime.utcnow()
-        )
-        db.add(history)
-        db.commit()
-        
-    return Response(
-        code=200,
-        data=schemas.ProductDetailsThroughBarcodeOut(
-            id=new_product.id,
-            name=new_product.name,
-            barcode=barcode,
-            brands=new_product.brands if new_product.brands else "Unknown",
-            categories=new_product.categories if new_product.categories else "Unknown",
-            imageUrl=new_product.image_url,
-            imageIngredientsUrl=image_ingredients_url,
-            imageNutritionUrl=image_nutrition_url,
-            isReviewed=False,
-            dateScanned=new_product.last_updated.strftime("%Y-%m-%d, %H:%M:%S"),
-            likesCount=0,
-            aiHealthSummary=summary,
-            aiHealthConclusion=conclusion,
-        ),
-        msg="Product fetched successfully"
+    new_product_id, image_ingredients_url, image_nutrition_url = created
+
+    def add_to_history():
+        new_product = db.query(models.Product).filter(models.Product.id == new_product_id).first()
+        # Add to user's scan history
+        if not _is_in_history(db, new_product.id, user_id):
+            history = models.History(
+                product_id=new_product.id,
+                user_id=user_id,
+                scanned_at=datetime.utcnow()
+            )
+            db.add(history)
+            # Flight followers and ON CONFLICT losers did not queue anything themselves;
+            # the leader's job is skipped here if it already covers these health flags
+            if health_flags and services.find_health_suggestion(db, new_product.id, services.health_flags_key(health_flags)) is None:
+                _queue_health_suggestion(db, new_product, user_id, health_flags)
+            db.commit()
+            db.refresh(new_product)
+        return new_product
+
+    new_product = await run_in_threadpool(add_to_history)
+    product_info = services.generate_ProductDetailsThroughBarcode(
+        new_product, None,
+        image_ingredients_url=image_ingredients_url,
+        image_nutrition_url=image_nutrition_url,
     )
+    return fast_response(product_info, "Product fetched successfully")
+
+
+def _queue_health_suggestion(db: Session, product: models.Product, user_id: int, health_flags: list[str]) -> None:
+    """
+    Queues only the ingredients health suggestion for a known product; the worker looks up the
+    OpenFoodFacts ingredients image. Nothing is queued while a pending or running job for the
+    product already covers the same health flags.
+    """
+    queued = db.query(models.EnrichmentJob.id).filter(
+        models.EnrichmentJob.product_id == product.id,
+        models.EnrichmentJob.health_flags_key == services.health_flags_key(health_flags),
+        models.EnrichmentJob.status.in_(("pending", "running")),
+    ).first()
+    if queued is None:
+        services.enqueue_enrichment(db, product, services.ENRICH_BARCODE_PRODUCT, {
+            "user_id": user_id,
+            "health_flags": health_flags,
+        })
+
+
+async def _create_barcode_product(barcode: str, user_id: int, health_flags: list[str]):
+    """
+    Looks a barcode up in OpenFoodFacts and stores it as a product queued for enrichment.
+    Returns (product_id, image_ingredients_url, image_nutrition_url), or None if OFF does not know it.
+    Runs once per barcode for all concurrent scanners, so it uses its own session.
+    """
+    def create():
+        with SessionLocal() as db:
+            product_data = services.get_off_product(barcode, db)
+            if not product_data:
+                return None
+
+            # Process OpenFoodFacts data
+            image_url = product_data.get("image_url")
+            image_ingredients_url = product_data.get("image_ingredients_url")
+            brands = product_data.get("brands") if product_data.get("brands") else "Unknown"
+            categories = product_data.get("categories") if product_data.get("categories") else "Unknown"
+
+            # The AI health analysis (and the front-image embedding) are filled in by the enrichment workers.
+            # ON CONFLICT covers another worker process inserting the same barcode first.
+            stmt = insert(models.Product).values(
+                barcode=barcode,
+                image_url=image_url,
+                name=product_data.get("product_name") or "Unknown",
+                generic_name=product_data.get("generic_name"),
+                ingredients=json.dumps(product_data.get("ingredients")),
+                categories=categories,
+                brands=brands,
+                ai_health_summary="The image does not contain a product ingredient table to analyze for dietary preferences.",
+                ai_health_conclusion="unknown",
+                last_updated=datetime.utcnow()
+            ).on_conflict_do_nothing(index_elements=[models.Product.barcode]).returning(models.Product.id)
+            new_product_id = db.execute(stmt).scalar()
+            if new_product_id is None:
+                db.rollback()
+                new_product_id = db.query(models.Product.id).filter(models.Product.barcode == barcode).scalar()
+                return new_product_id, image_ingredients_url, product_data.get("image_nutrition_url")
+
+            new_product = db.get(models.Product, new_product_id)
+            if image_url or image_ingredients_url:
+                services.enqueue_enrichment(db, new_product, services.ENRICH_BARCODE_PRODUCT, {
+                    "user_id": user_id,
+                    "image_url": image_url,
+                    "image_ingredients_url": image_ingredients_url,
+                    "health_flags": health_flags,
+                })
+            db.commit()
+            return new_product.id, image_ingredients_url, product_data.get("image_nutrition_url")
+
+    return await run_in_threadpool(create)
 
 @router.post("/health_suggestion", response_model=Response[schemas.ProductDetailsFrontend])
-def update_ai_health_suggestion(
+async def update_ai_health_suggestion(
     request: schemas.ProductAISuggestionRequest,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    product = db.query(models.Product).filter(models.Product.id == request.productId).first()
+    try:
+        image = await run_in_threadpool(services.prepare_base64_image, request.base64Image)
+    except ValueError as e:
+        return response.error(msg=str(e), code=400)
+    return await _health_suggestion(request.productId, image, db, current_user)
+
+
+@router.post("/health_suggestion/upload", response_model=Response[schemas.ProductDetailsFrontend])
+async def update_ai_health_suggestion_upload(
+    productId: int = Form(...),
+    image: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Multipart variant of POST /products/health_suggestion (ingredients photo as a file)."""
+    try:
+        prepared = await run_in_threadpool(services.prepare_image_file, image.file, image.content_type or "image/jpeg")
+    except ValueError as e:
+        return response.error(msg=str(e), code=400)
+    finally:
+        await image.close()
+    return await _health_suggestion(productId, prepared, db, current_user)
+
+
+async def _health_suggestion(product_id: int, image: services.PreparedImage, db: Session, current_user: models.User):
+    product = await run_in_threadpool(lambda: db.query(models.Product).filter(models.Product.id == product_id).first())
     if not product:
         return response.not_found(msg="Product not found", code=404)
 
-    health_flags = current_user.user_health_flags
-    health_flags = [flag.health_flag.name for flag in health_flags]
-    conclusion, summary = services.get_AI_health_suggestion(request.base64Image, health_flags)
+    health_flags = await run_in_threadpool(_health_flag_names, current_user, db)
+    # Reuses the suggestion of any user with the same health flags for this ingredients image
+    conclusion, summary = await services.get_health_suggestion_stored(db, product.id, health_flags, image.hash, image.data_uri)
 
-    product.ai_health_summary = summary
-    product.ai_health_conclusion = conclusion
-    product.last_updated = datetime.utcnow()
-    db.commit()
-    db.refresh(product)
+    def save_suggestion():
+        # The product columns only hold a default for users without a stored suggestion
+        if not product.ai_health_summary or product.ai_health_conclusion in (None, "unknown"):
+            product.ai_health_summary = summary
+            product.ai_health_conclusion = conclusion
+        product.last_updated = datetime.utcnow()
+        db.commit()
+        db.refresh(product)
+        return _user_review(db, product.id, current_user.id)
 
-    review = db.query(models.Review).filter(
-        models.Review.product_id == product.id,
-        models.Review.user_id == current_user.id
-    ).first()
+    review = await run_in_threadpool(save_suggestion)
     
 
-    product_details = schemas.ProductDetailsFrontend(
-        id=product.id,
-        name=product.name,
-        brands=product.brands if product.brands else "Unknown",
-        barcode=product.barcode,
-        imageUrl=product.image_url,
-        categories=product.categories if product.categories else "Unknown",
-        isReviewed=bool(review),
-        userRating=review.rating if review else None,
-        userNotes=review.note if review else None,
-        aiHealthSummary=summary if summary else "The image does not contain a product ingredient table to analyze for dietary preferences.",
-        aiHealthConclusion=conclusion if conclusion else "unknown",
-        dateScanned=product.last_updated.strftime("%Y-%m-%d, %H:%M:%S"),
-        dateReviewed=review.note if review else None
-    )
-
-    return Response(code=200, data=product_details, msg="AI suggestion updated and product info returned")
+    product_details = services.generate_ProductDetailsFrontend(product, review, summary=summary, conclusion=conclusion)
+    return fast_response(product_details, "AI suggestion updated and product info returned")
 
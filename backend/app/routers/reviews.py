@@ -1,9 +1,10 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import Response as FastAPIResponse
 from sqlalchemy.orm import Session
-from app import models, schemas
+from app import models, schemas, services
 from app.db.db import get_db
-from app.utils import response
+from app.utils import response, conditional
 from app.utils.ResponseResult import Response
 from app.utils.dependencies import get_current_user
 router = APIRouter(tags=["Reviews"])
@@ -67,7 +68,12 @@ def get_user_reviews(user_id: int, db: Session = Depends(get_db)):
     return Response(code=200, data=db_review, msg="Reviews fetched successfully")
 
 @router.get("/reviews/products", response_model=Response[List[schemas.ReviewProductListFrontend]])
-def get_product_reviews_list(db: Session = Depends(get_db),current_user: models.User = Depends(get_current_user)):
+def get_product_reviews_list(request: Request, http_response: FastAPIResponse, db: Session = Depends(get_db),current_user: models.User = Depends(get_current_user)):
+    flags_key = services.health_flags_key(services.health_flag_names_for(current_user, db))
+    version = services.review_list_version(db, current_user, flags_key)
+    unchanged = conditional.not_modified(request, version)
+    if unchanged is not None:
+        return unchanged
     db_reviews = db.query(models.Review).filter(models.Review.user_id == current_user.id).all()
     if not db_reviews:
         return response.not_found(msg="No reviews found",code=404)
@@ -86,5 +92,6 @@ def get_product_reviews_list(db: Session = Depends(get_db),current_user: models.
             likeCount=review.likes_count    
         )
         reviews.append(review_data)
-    
+
+    http_response.headers.update(version.headers())
     return Response(code=200, data=reviews, msg="Reviews fetched successfully")
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app import schemas, models
+from app import schemas, models, services
 from app.db.db import get_db
 from typing import List
 from app.utils import response
@@ -20,7 +20,7 @@ def login(user: schemas.UserLogin, db: Session = Depends(get_db)):
         return response.not_found(msg="User not found",code=404)
     if not verify_password(user.password, db_user.password):
         return Response(code=401, data=None, msg="Incorrect password or email")
-    access_token = create_access_token(data={"sub": db_user.email})
+    access_token = create_access_token(data={"sub": db_user.email, "user_id": db_user.id})
     return Response(code=200, data={"access_token": access_token, "token_type": "bearer"}, msg="User logged in successfully")
 
 
@@ -29,8 +29,8 @@ def logout(_: models.User = Depends(get_current_user)):
     return Response(code=200, data=None, msg="User logged out successfully")
 
 @router.get("/auth/me", response_model=Response[schemas.UserProfileFrontendOut])
-def get_me(current_user: models.User = Depends(get_current_user)):
-    health_flag_names = [hf.health_flag.name for hf in current_user.user_health_flags]
+def get_me(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    health_flag_names = services.health_flag_names_for(current_user, db)
     badges = [badge.badge.ref for badge in current_user.user_badges]
     user_profile = schemas.UserProfileFrontendOut(
         id=current_user.id,
@@ -84,17 +84,8 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db.flush()
 
     if user.healthFlags: 
-        for flag_name_in in user.healthFlags: 
-            flag_db = db.query(models.HealthFlag).filter(models.HealthFlag.name == flag_name_in).first()
-            if not flag_db:
-                flag_db = models.HealthFlag(name=flag_name_in) 
-                db.add(flag_db)
-                db.flush() 
-            
-            existing_user_flag = db.query(models.UserHealthFlag).filter_by(user_id=db_user.id, health_flag_id=flag_db.id).first()
-            if not existing_user_flag:
-                user_health_flag_assoc = models.UserHealthFlag(user_id=db_user.id, health_flag_id=flag_db.id)
-                db.add(user_health_flag_assoc)
+        for flag_id in services.resolve_health_flag_ids(db, user.healthFlags):
+            db.add(models.UserHealthFlag(user_id=db_user.id, health_flag_id=flag_id))
     
     db.commit()
     db.refresh(db_user)
@@ -111,11 +102,7 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
 @router.get("/health_flags", response_model=Response[List[schemas.HealthFlagOut]])
 def get_health_flags(db: Session = Depends(get_db)):
-    health_flags = db.query(models.HealthFlag).all()
-    health_flags_out = [schemas.HealthFlagOut(
-        healthFlagId=health_flag.id,
-        name=health_flag.name
-    ) for health_flag in health_flags]
+    health_flags_out = services.reference_data.get(db).health_flags
     return Response(code=200, data=health_flags_out, msg="Health flags fetched successfully")
 
 
@@ -153,6 +140,8 @@ def delete_all_users(db: Session = Depends(get_db)):
 
     db.query(models.User).delete()
     db.commit()
+    services.user_embedding_cache.clear()
+    services.invalidate_user_identity()
     return Response(code=200, msg="All users deleted successfully")
 
 
@@ -165,6 +154,8 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
         raise response.not_found(msg="User not found",code=404)
     db.delete(db_user)
     db.commit()
+    services.user_embedding_cache.invalidate(user_id)
+    services.invalidate_user_identity(user_id)
     return Response(code=200,data=None, msg="User deleted successfully")
 
 @router.get("/{user_id}/health_flags", response_model=Response[List[schemas.HealthFlagOut]])
@@ -194,18 +185,11 @@ def update_user(user_id: int, payload: schemas.UserUpdateFrontend, db: Session =
     print(update_data)
     if "healthFlags" in update_data:
         db.query(models.UserHealthFlag).filter(models.UserHealthFlag.user_id == user_id).delete()
-        for flag_name_in in payload.healthFlags:
-            print(flag_name_in)
-            flag_db = db.query(models.HealthFlag).filter(models.HealthFlag.name == flag_name_in).first()
-            if not flag_db:
-                flag_db = models.HealthFlag(name=flag_name_in)
-                db.add(flag_db)
-                db.commit()
-                db.refresh(flag_db)
-            user_health_flag_assoc = models.UserHealthFlag(user_id=db_user.id, health_flag_id=flag_db.id)
-            db.add(user_health_flag_assoc)
+        for flag_id in services.resolve_health_flag_ids(db, payload.healthFlags):
+            db.add(models.UserHealthFlag(user_id=db_user.id, health_flag_id=flag_id))
     db.commit()
     db.refresh(db_user)
+    services.invalidate_user_identity(user_id)
     health_flag_names = [hf.health_flag.name for hf in db_user.user_health_flags]
     user_profile = schemas.UserUpdateFrontendOut(
         id=db_user.id,
@@ -66,6 +66,7 @@ class ProductDetailsFrontend(BaseModel):
     aiHealthConclusion: Optional[str] = None
     dateScanned: Optional[str] = None
     dateReviewed: Optional[str] = None
+    enrichmentStatus: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -92,6 +93,7 @@ class ProductDetailsThroughBarcode(BaseModel):
     likesCount: Optional[int] = None
     aiHealthSummary: Optional[str] = None
     aiHealthConclusion: Optional[str] = None
+    enrichmentStatus: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -115,3 +117,18 @@ class ProductDetailsThroughBarcodeOut(ProductDetailsThroughBarcode):
 class ProductAISuggestionRequest(BaseModel):
     productId: int
     base64Image: str
+
+
+class ProductImageBatchRequest(BaseModel):
+    base64images: List[str]
+
+
+class ProductEnrichmentStatus(BaseModel):
+    productId: int
+    enrichmentStatus: str
+
+
+class ProductImageBatchItem(BaseModel):
+    index: int
+    product: Optional[ProductDetailsFrontend] = None
+    error: Optional[str] = None
@@ -1 +1,14 @@
-from .product_service import *  
\ No newline at end of file
+from .product_service import *
+from .openfoodfacts import get_off_product, off_cache_stats
+from .scan_pipeline import run_scan_stages
+from .ai_client import get_ai_http_client, close_ai_http_client, image_url_to_base64_async, get_image_embedding_async, get_AI_product_info_async, get_AI_health_suggestion_async
+from .image_memo import image_hash, get_image_embedding_memo, get_AI_product_info_memo, image_memo_stats
+from .health_suggestions import canonical_health_flags, health_flags_key, find_health_suggestion, find_health_suggestions, save_health_suggestion, get_health_suggestion_stored
+from .user_embeddings import user_embedding_cache, most_similar_img_for_user_cached, most_similar_imgs_for_user_cached
+from .enrichment import enqueue_enrichment, start_enrichment_workers, stop_enrichment_workers, ENRICH_IMAGE_PRODUCT, ENRICH_BARCODE_PRODUCT, PENDING_PRODUCT_NAME
+from .storage import image_public_url, upload_image, upload_image_async, upload_image_background
+from .image_preprocess import PreparedImage, prepare_image, prepare_base64_image, prepare_image_file
+from .perceptual_hash import phash_index
+from .listing_versions import product_list_version, review_list_version, badge_list_version
+from .reference_data import reference_data, load_reference_data, health_flag_names_for, resolve_health_flag_ids
+from .user_identity import UserRecord, load_user_record, cached_user_record, invalidate_user_identity
@@ -0,0 +1,79 @@
+import base64
+import mimetypes
+import httpx
+import numpy as np
+
+from app.core.config import (
+    AI_SERVICE_URL,
+    AI_HTTP2,
+    AI_CONNECT_TIMEOUT,
+    AI_READ_TIMEOUT,
+    AI_MAX_CONNECTIONS,
+    AI_MAX_KEEPALIVE_CONNECTIONS,
+)
+from app.services.product_service import embedding_from_response
+
+_ai_http_client: httpx.AsyncClient | None = None
+
+
+def get_ai_http_client() -> httpx.AsyncClient:
+    """
+    Returns the worker's shared AsyncClient, creating it on first use.
+    All AI service calls and image downloads reuse its keep-alive (HTTP/2 when
+    available) connection pool instead of opening a connection per request.
+    """
+    global _ai_http_client
+    if _ai_http_client is None:
+        _ai_http_client = httpx.AsyncClient(
+            http2=AI_HTTP2,
+            timeout=httpx.Timeout(AI_READ_TIMEOUT, connect=AI_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=AI_MAX_CONNECTIONS,
+                max_keepalive_connections=AI_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+    return _ai_http_client
+
+
+async def close_ai_http_client() -> None:
+    global _ai_http_client
+    if _ai_http_client is not None:
+        await _ai_http_client.aclose()
+        _ai_http_client = None
+
+
+async def _post_ai_service(path: str, payload: dict) -> dict:
+    response = await get_ai_http_client().post(f"{AI_SERVICE_URL}{path}", json=payload)
+    if response.is_success:
+        print(f"Success on {path}")
+    else:
+        print("Error:", response.status_code, response.text)
+    response.raise_for_status()
+    return response.json()
+
+
+async def image_url_to_base64_async(image_url: str) -> str:
+    mime_type, _ = mimetypes.guess_type(image_url)
+    if not mime_type:
+        raise ValueError("Cannot determine the MIME type of the file")
+
+    response = await get_ai_http_client().get(image_url)
+    response.raise_for_status()
+    base64_string = base64.b64encode(response.content).decode("utf-8")
+    return f"data:{mime_type};base64,{base64_string}"
+
+
+async def get_image_embedding_async(base64image: str) -> np.ndarray:
+    # Ask for raw float32 bytes; older AI service versions ignore the field and send a float list
+    data = await _post_ai_service("/image-encode", {"image": base64image, "embeddingFormat": "base64"})
+    return embedding_from_response(data)
+
+
+async def get_AI_product_info_async(base64image: str) -> tuple[str, str, str]:
+    data = (await _post_ai_service("/product-info", {"image": base64image}))["response"]
+    return data["productName"], data["productManufacturer"], data["productDescription"]
+
+
+async def get_AI_health_suggestion_async(base64image: str, health_flags: list[str]) -> tuple[str, str]:
+    data = (await _post_ai_service("/health-suggestion", {"image": base64image, "dietaryPref": ",".join(health_flags)}))["response"]
+    return data["opinion"], data["reason"]
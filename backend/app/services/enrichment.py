@@ -0,0 +1,204 @@
+import asyncio
+import datetime
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import (
+    ENRICHMENT_WORKERS,
+    ENRICHMENT_POLL_INTERVAL,
+    ENRICHMENT_MAX_ATTEMPTS,
+    ENRICHMENT_JOB_TIMEOUT,
+    STORAGE_FIRE_AND_FORGET,
+)
+from app.db.db_supabase import SessionLocal
+from app.services.product_service import bytes_to_data_uri
+from app.services.storage import upload_image_async, upload_image_background
+from app.services.ai_client import image_url_to_base64_async, get_image_embedding_async
+from app.services.image_memo import get_AI_product_info_memo
+from app.services.image_preprocess import prepare_base64_image
+from app.services.health_suggestions import health_flags_key, get_health_suggestion_stored
+from app.services.openfoodfacts import get_off_product
+from app.services.scan_pipeline import run_scan_stages
+from app.services.user_embeddings import user_embedding_cache
+
+ENRICH_IMAGE_PRODUCT = "image_product"
+ENRICH_BARCODE_PRODUCT = "barcode_product"
+
+STATUS_READY = "ready"
+STATUS_ENRICHING = "enriching"
+STATUS_FAILED = "failed"
+
+# Shown until the product-info call has named an image-scanned product
+PENDING_PRODUCT_NAME = "Recognizing product..."
+
+_workers: list[asyncio.Task] = []
+_wakeup: asyncio.Event | None = None
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def enqueue_enrichment(db: Session, product: models.Product, kind: str, payload: dict, image_data: bytes | None = None) -> models.EnrichmentJob:
+    """
+    Marks a product as enriching and queues its enrichment job in the same session.
+    The caller commits; local workers are woken up right away, other workers pick
+    the job up on their next poll.
+    """
+    product.enrichment_status = STATUS_ENRICHING
+    flags_key = health_flags_key(payload["health_flags"]) if "health_flags" in payload else None
+    job = models.EnrichmentJob(product=product, kind=kind, payload=payload, image_data=image_data, health_flags_key=flags_key)
+    db.add(job)
+    if _loop is not None and _wakeup is not None:
+        _loop.call_soon_threadsafe(_wakeup.set)
+    return job
+
+
+def _claim_job(db: Session) -> models.EnrichmentJob | None:
+    now = datetime.datetime.utcnow()
+    stale = now - datetime.timedelta(seconds=ENRICHMENT_JOB_TIMEOUT)
+    job = (
+        db.query(models.EnrichmentJob)
+        .filter(or_(
+            and_(models.EnrichmentJob.status == "pending", models.EnrichmentJob.available_at <= now),
+            # Jobs of a worker that died mid-run
+            and_(models.EnrichmentJob.status == "running", models.EnrichmentJob.started_at < stale),
+        ))
+        .order_by(models.EnrichmentJob.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.commit()
+        return None
+    job.status = "running"
+    job.attempts += 1
+    job.started_at = now
+    db.commit()
+    return job
+
+
+def _finish_job(db: Session, job: models.EnrichmentJob, error: Exception | None) -> None:
+    product = job.product
+    if error is None:
+        product.enrichment_status = STATUS_READY
+        db.delete(job)
+    elif job.attempts >= ENRICHMENT_MAX_ATTEMPTS:
+        product.enrichment_status = STATUS_FAILED
+        job.status = "failed"
+        job.last_error = str(error)
+    else:
+        job.status = "pending"
+        job.last_error = str(error)
+        job.available_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=2 ** job.attempts)
+    db.commit()
+
+
+async def _enrich_image_product(db: Session, job: models.EnrichmentJob) -> None:
+    mime_type = job.payload.get("mime_type", "image/jpeg")
+    base64image = bytes_to_data_uri(job.image_data, mime_type)
+    if STORAGE_FIRE_AND_FORGET:
+        image_url = upload_image_background(job.image_data, mime_type)
+        product_name, product_manufacturer, product_description = await get_AI_product_info_memo(job.payload["image_hash"], base64image, db)
+    else:
+        image_url, (product_name, product_manufacturer, product_description) = await asyncio.gather(
+            upload_image_async(job.image_data, mime_type),
+            get_AI_product_info_memo(job.payload["image_hash"], base64image, db),
+        )
+
+    def save():
+        product = job.product
+        product.name = product_name
+        product.image_url = image_url
+        product.brands = product_manufacturer
+        product.ai_health_summary = product_description
+        product.ai_health_conclusion = "unknown"
+        product.last_updated = datetime.datetime.utcnow()
+        job.image_data = None
+    await run_in_threadpool(save)
+
+
+async def _enrich_barcode_product(db: Session, job: models.EnrichmentJob) -> None:
+    payload = dict(job.payload)
+    health_flags = payload.get("health_flags", [])
+    product_id = job.product_id
+    if "image_ingredients_url" not in payload:
+        # Suggestion-only jobs for known products: the OpenFoodFacts lookup is done here, not in the scan request
+        product_data = await run_in_threadpool(get_off_product, job.product.barcode, db)
+        payload["image_ingredients_url"] = product_data.get("image_ingredients_url") if product_data else None
+
+    async def fetch_image(url):
+        return await run_in_threadpool(prepare_base64_image, await image_url_to_base64_async(url))
+
+    async def embed_front_image():
+        return await get_image_embedding_async((await fetch_image(payload["image_url"])).data_uri)
+
+    async def suggest_from_ingredients():
+        ingredients = await fetch_image(payload["image_ingredients_url"])
+        conclusion, summary = await get_health_suggestion_stored(db, product_id, health_flags, ingredients.hash, ingredients.data_uri)
+        return conclusion, summary
+
+    # The front-image embedding and the ingredients health suggestion are independent, so run them side by side
+    stages = {}
+    if payload.get("image_url"):
+        stages["embedding"] = embed_front_image()
+    if payload.get("image_ingredients_url"):
+        stages["health_suggestion"] = suggest_from_ingredients()
+    results, _ = await run_scan_stages(stages)
+
+    def save():
+        product = job.product
+        if "embedding" in results:
+            product.image_embedding = results["embedding"]
+            user_embedding_cache.add(payload["user_id"], product.id, results["embedding"])
+        # Per-flag suggestions live in health_suggestions; the product columns only hold the first one as a default
+        if "health_suggestion" in results and product.ai_health_conclusion in (None, "unknown"):
+            product.ai_health_conclusion, product.ai_health_summary = results["health_suggestion"]
+            product.last_updated = datetime.datetime.utcnow()
+    await run_in_threadpool(save)
+
+
+_HANDLERS = {
+    ENRICH_IMAGE_PRODUCT: _enrich_image_product,
+    ENRICH_BARCODE_PRODUCT: _enrich_barcode_product,
+}
+
+
+async def _run_worker(worker_id: int) -> None:
+    while True:
+        with SessionLocal() as db:
+            try:
+                job = await run_in_threadpool(_claim_job, db)
+            except Exception as e:
+                print(f"Enrichment worker {worker_id}: failed to claim a job: {e}")
+                job = None
+            if job is None:
+                _wakeup.clear()
+                try:
+                    await asyncio.wait_for(_wakeup.wait(), timeout=ENRICHMENT_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            error = None
+            try:
+                await _HANDLERS[job.kind](db, job)
+            except Exception as e:
+                print(f"Enrichment job {job.id} ({job.kind}) for product {job.product_id} failed: {e}")
+                error = e
+                await run_in_threadpool(db.rollback)
+            await run_in_threadpool(_finish_job, db, job, error)
+
+
+def start_enrichment_workers() -> None:
+    global _wakeup, _loop
+    _loop = asyncio.get_running_loop()
+    _wakeup = asyncio.Event()
+    for worker_id in range(ENRICHMENT_WORKERS):
+        _workers.append(asyncio.create_task(_run_worker(worker_id)))
+
+
+async def stop_enrichment_workers() -> None:
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,83 @@
+import datetime
+from typing import Iterable
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+
+from app import models
+from app.services.ai_client import get_AI_health_suggestion_async
+
+
+def canonical_health_flags(health_flags: Iterable[str]) -> list[str]:
+    """Lower-cased, de-duplicated and sorted flags, so equivalent profiles look identical."""
+    return sorted({flag.strip().lower() for flag in health_flags if flag and flag.strip()})
+
+
+def health_flags_key(health_flags: Iterable[str]) -> str:
+    return ",".join(canonical_health_flags(health_flags))
+
+
+def find_health_suggestion(db: Session, product_id: int, flags_key: str, image_hash: str | None = None) -> models.HealthSuggestion | None:
+    """
+    Returns the stored suggestion for a product and flag set. Without an image
+    hash the most recent suggestion for any ingredients image is returned.
+    """
+    query = db.query(models.HealthSuggestion).filter(
+        models.HealthSuggestion.product_id == product_id,
+        models.HealthSuggestion.health_flags_key == flags_key,
+    )
+    if image_hash is not None:
+        query = query.filter(models.HealthSuggestion.image_hash == image_hash)
+    return query.order_by(models.HealthSuggestion.created_at.desc()).first()
+
+
+def find_health_suggestions(db: Session, product_ids: list[int], flags_key: str) -> dict[int, models.HealthSuggestion]:
+    """Most recent suggestion per product for a flag set, fetched in one query."""
+    if not product_ids:
+        return {}
+    rows = (
+        db.query(models.HealthSuggestion)
+        .filter(
+            models.HealthSuggestion.product_id.in_(product_ids),
+            models.HealthSuggestion.health_flags_key == flags_key,
+        )
+        .distinct(models.HealthSuggestion.product_id)
+        .order_by(models.HealthSuggestion.product_id, models.HealthSuggestion.created_at.desc())
+        .all()
+    )
+    return {row.product_id: row for row in rows}
+
+
+def save_health_suggestion(db: Session, product_id: int, flags_key: str, image_hash: str, conclusion: str, summary: str) -> None:
+    # created_at is refreshed on conflict too: it stamps the listings that show the suggestion
+    values = {"ai_health_conclusion": conclusion, "ai_health_summary": summary, "created_at": datetime.datetime.utcnow()}
+    stmt = insert(models.HealthSuggestion).values(
+        product_id=product_id, health_flags_key=flags_key, image_hash=image_hash, **values
+    )
+    db.execute(stmt.on_conflict_do_update(constraint="uq_health_suggestions_product_flags_image", set_=values))
+    db.commit()
+
+
+async def get_health_suggestion_stored(
+    db: Session,
+    product_id: int | None,
+    health_flags: Iterable[str],
+    image_hash: str,
+    base64image: str,
+) -> tuple[str, str]:
+    """
+    Returns (conclusion, summary) for an ingredients image and flag set, reusing a
+    stored suggestion when one exists. `product_id` may be None for a product that
+    is not in the database yet; the caller then saves the result once it is.
+    """
+    flags = canonical_health_flags(health_flags)
+    flags_key = ",".join(flags)
+    if product_id is not None:
+        stored = await run_in_threadpool(find_health_suggestion, db, product_id, flags_key, image_hash)
+        if stored:
+            return stored.ai_health_conclusion, stored.ai_health_summary
+
+    conclusion, summary = await get_AI_health_suggestion_async(base64image, flags)
+    if product_id is not None:
+        await run_in_threadpool(save_health_suggestion, db, product_id, flags_key, image_hash, conclusion, summary)
+    return conclusion, summary
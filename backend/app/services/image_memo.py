@@ -0,0 +1,90 @@
+import hashlib
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+
+from app import models
+from app.core.config import IMAGE_MEMO_MAXSIZE
+from app.services.product_service import base64_to_bytes
+from app.db.db_supabase import SessionLocal
+from app.services.ai_client import get_image_embedding_async, get_AI_product_info_async
+from app.utils.cache import LRUCache
+from app.utils.singleflight import SingleFlight
+
+# image hash -> {"embedding": [...], "product_info": (name, manufacturer, description)}
+_image_memory_cache = LRUCache(maxsize=IMAGE_MEMO_MAXSIZE)
+# Concurrent scans of the same image share one AI call
+_image_flight = SingleFlight()
+
+
+def image_hash(base64image: str) -> str:
+    """SHA-256 of the decoded image bytes, so data-URL prefixes and re-encodings of the same file collide."""
+    return hashlib.sha256(base64_to_bytes(base64image)).hexdigest()
+
+
+def _load_image_result(key: str, db: Session) -> dict:
+    row = db.query(models.ImageAIResult).filter(models.ImageAIResult.image_hash == key).first()
+    entry = {}
+    if row is None:
+        return entry
+    if row.image_embedding is not None:
+        entry["embedding"] = np.asarray(row.image_embedding, dtype=np.float32)
+    if row.product_name is not None:
+        entry["product_info"] = (row.product_name, row.product_manufacturer, row.product_description)
+    return entry
+
+
+def _save_image_result(key: str, **values) -> None:
+    # Own session: the computation is shared between requests and may outlive the one that started it
+    with SessionLocal() as db:
+        stmt = insert(models.ImageAIResult).values(image_hash=key, **values)
+        db.execute(stmt.on_conflict_do_update(index_elements=[models.ImageAIResult.image_hash], set_=values))
+        db.commit()
+
+
+async def _memo_entry(key: str, db: Session) -> dict:
+    entry = _image_memory_cache.get(key)
+    if entry is None:
+        entry = await run_in_threadpool(_load_image_result, key, db)
+        _image_memory_cache.set(key, entry)
+    return entry
+
+
+async def get_image_embedding_memo(key: str, base64image: str, db: Session) -> np.ndarray:
+    """
+    Returns the normalized embedding for an image, calling /image-encode only
+    the first time a given image (by hash) is seen.
+    """
+    entry = await _memo_entry(key, db)
+    if "embedding" not in entry:
+        async def compute():
+            embedding = await get_image_embedding_async(base64image)
+            await run_in_threadpool(_save_image_result, key, image_embedding=embedding)
+            return embedding
+        entry["embedding"] = await _image_flight.do(("embedding", key), compute)
+    return entry["embedding"]
+
+
+async def get_AI_product_info_memo(key: str, base64image: str, db: Session) -> tuple[str, str, str]:
+    """
+    Returns (name, manufacturer, description) for an image, calling /product-info
+    only the first time a given image (by hash) is seen.
+    """
+    entry = await _memo_entry(key, db)
+    if "product_info" not in entry:
+        async def compute():
+            product_name, product_manufacturer, product_description = await get_AI_product_info_async(base64image)
+            await run_in_threadpool(
+                _save_image_result, key,
+                product_name=product_name,
+                product_manufacturer=product_manufacturer,
+                product_description=product_description,
+            )
+            return product_name, product_manufacturer, product_description
+        entry["product_info"] = await _image_flight.do(("product_info", key), compute)
+    return entry["product_info"]
+
+
+def image_memo_stats() -> dict:
+    return {**_image_memory_cache.stats(), "single_flight": _image_flight.stats()}
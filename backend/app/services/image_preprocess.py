@@ -0,0 +1,103 @@
+import hashlib
+import io
+from typing import BinaryIO
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.core.config import IMAGE_NORMALIZE, IMAGE_MAX_EDGE, IMAGE_FORMAT, IMAGE_QUALITY
+from app.services.product_service import base64_to_bytes, base64_mime_type, bytes_to_data_uri
+from app.services.perceptual_hash import dhash, dhash_bytes
+
+_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+class PreparedImage:
+    """
+    A scan image decoded once and normalized, shared by every downstream consumer:
+    `hash` for the memo tables, `dhash` for the perceptual-hash index, `data_uri`
+    for the AI service and `data` for storage.
+    """
+
+    def __init__(self, data: bytes, mime_type: str, original_size: int, dhash: int | None = None):
+        self.data = data
+        self.mime_type = mime_type
+        self.original_size = original_size
+        self._hash = None
+        self._dhash = dhash
+        self._data_uri = None
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @property
+    def hash(self) -> str:
+        if self._hash is None:
+            self._hash = hashlib.sha256(self.data).hexdigest()
+        return self._hash
+
+    @property
+    def dhash(self) -> int | None:
+        """None when the bytes could not be decoded (only possible with IMAGE_NORMALIZE off)."""
+        if self._dhash is None:
+            try:
+                self._dhash = dhash_bytes(self.data)
+            except ValueError:
+                return None
+        return self._dhash
+
+    @property
+    def data_uri(self) -> str:
+        if self._data_uri is None:
+            self._data_uri = bytes_to_data_uri(self.data, self.mime_type)
+        return self._data_uri
+
+
+def _normalize(source: BinaryIO) -> tuple[bytes, str, int]:
+    try:
+        image = Image.open(source)
+        image.load()
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"Invalid image: {e}") from e
+
+    # Phones store rotation as an EXIF tag; bake it in since the tag is dropped on re-encode
+    image = ImageOps.exif_transpose(image)
+    if IMAGE_FORMAT == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((IMAGE_MAX_EDGE, IMAGE_MAX_EDGE), Image.LANCZOS)
+
+    out = io.BytesIO()
+    image.save(out, format=IMAGE_FORMAT, quality=IMAGE_QUALITY, optimize=True)
+    # Hashed while the image is decoded anyway
+    return out.getvalue(), _MIME_TYPES[IMAGE_FORMAT], dhash(image)
+
+
+def prepare_image(image_bytes: bytes, mime_type: str = "image/jpeg") -> PreparedImage:
+    """
+    Applies EXIF orientation, downscales to IMAGE_MAX_EDGE and re-encodes at IMAGE_QUALITY.
+    Raises ValueError if the bytes are not a decodable image.
+    """
+    return prepare_image_file(io.BytesIO(image_bytes), mime_type)
+
+
+def prepare_base64_image(base64image: str) -> PreparedImage:
+    try:
+        image_bytes = base64_to_bytes(base64image)
+    except ValueError as e:
+        raise ValueError("Invalid base64 image") from e
+    return prepare_image(image_bytes, base64_mime_type(base64image))
+
+
+def prepare_image_file(file: BinaryIO, mime_type: str = "image/jpeg") -> PreparedImage:
+    """
+    prepare_image for a file: decodes straight from a (spooled) upload so the raw
+    upload is never held as one bytes object or base64 string.
+    """
+    file.seek(0, io.SEEK_END)
+    original_size = file.tell()
+    file.seek(0)
+    if not IMAGE_NORMALIZE:
+        return PreparedImage(file.read(), mime_type, original_size)
+
+    data, normalized_mime_type, image_dhash = _normalize(file)
+    print(f"Image normalized: {original_size} -> {len(data)} bytes")
+    return PreparedImage(data, normalized_mime_type, original_size, image_dhash)
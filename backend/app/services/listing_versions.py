@@ -0,0 +1,83 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.enrichment import STATUS_READY
+from app.utils.conditional import ListingVersion, make_version
+
+# Each stamp is one aggregate over the user's rows (served by the (user_id, <timestamp>) indexes),
+# so a 304 never loads or serializes the listing itself.
+
+
+def _review_stamp(db: Session, user_id: int) -> tuple:
+    return db.query(func.count(models.Review.id), func.max(models.Review.updated_at)).filter(
+        models.Review.user_id == user_id
+    ).one()
+
+
+def _suggestion_stamp(db: Session, owner, user_id: int, flags_key: str):
+    """Newest suggestion for the flag key on the products behind the user's `owner` rows (History or Review)."""
+    return db.query(func.max(models.HealthSuggestion.created_at)).join(
+        owner, owner.product_id == models.HealthSuggestion.product_id
+    ).filter(
+        owner.user_id == user_id,
+        models.HealthSuggestion.health_flags_key == flags_key,
+    ).scalar()
+
+
+def _newest(*timestamps):
+    present = [ts for ts in timestamps if ts is not None]
+    return max(present) if present else None
+
+
+def product_list_version(db: Session, user_id: int, flags_key: str) -> ListingVersion:
+    """
+    Version of GET /products/currentuser/list/products. Besides history and reviews it covers
+    the listed products themselves (their last update and how many are still being enriched),
+    and the newest stored suggestion for the user's health-flag key, since that selects which
+    suggestion each item shows.
+    """
+    history_count, last_scanned, enriching, product_updated = (
+        db.query(
+            func.count(models.History.id),
+            func.max(models.History.scanned_at),
+            func.count(models.Product.id).filter(models.Product.enrichment_status != STATUS_READY),
+            func.max(models.Product.last_updated),
+        )
+        .join(models.Product, models.History.product_id == models.Product.id)
+        .filter(models.History.user_id == user_id)
+        .one()
+    )
+    last_suggested = _suggestion_stamp(db, models.History, user_id, flags_key)
+    review_count, last_reviewed = _review_stamp(db, user_id)
+    return make_version(
+        "products", user_id, flags_key, history_count, last_scanned, enriching, product_updated, last_suggested,
+        review_count, last_reviewed,
+        last_modified=_newest(last_scanned, product_updated, last_suggested, last_reviewed),
+    )
+
+
+def review_list_version(db: Session, user: models.User, flags_key: str) -> ListingVersion:
+    """
+    Version of GET /reviews/products; the user's name is part of every item, and the reviewed
+    products and their suggestions for the user's health-flag key are stamped as well.
+    """
+    review_count, last_reviewed, product_updated = (
+        db.query(func.count(models.Review.id), func.max(models.Review.updated_at), func.max(models.Product.last_updated))
+        .join(models.Product, models.Review.product_id == models.Product.id)
+        .filter(models.Review.user_id == user.id)
+        .one()
+    )
+    last_suggested = _suggestion_stamp(db, models.Review, user.id, flags_key)
+    return make_version(
+        "reviews", user.id, user.name, flags_key, review_count, last_reviewed, product_updated, last_suggested,
+        last_modified=_newest(last_reviewed, product_updated, last_suggested),
+    )
+
+
+def badge_list_version(db: Session, user_id: int) -> ListingVersion:
+    """Version of GET /badges/."""
+    badge_count, last_awarded = db.query(func.count(models.UserBadge.badge_id), func.max(models.UserBadge.created_at)).filter(
+        models.UserBadge.user_id == user_id
+    ).one()
+    return make_version("badges", user_id, badge_count, last_awarded, last_modified=last_awarded)
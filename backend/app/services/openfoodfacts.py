@@ -0,0 +1,108 @@
+import datetime
+import threading
+import requests
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+
+from app import models
+from app.core.config import (
+    OPEN_FOOD_FACTS_URL,
+    OPEN_FOOD_FACTS_TIMEOUT,
+    OFF_CACHE_TTL,
+    OFF_NEGATIVE_CACHE_TTL,
+    OFF_CACHE_MAXSIZE,
+)
+from app.db.db_supabase import SessionLocal
+from app.utils.cache import LRUCache
+
+# barcode -> (found, payload); the hot tier in front of the openfoodfacts_cache table
+_off_memory_cache = LRUCache(maxsize=OFF_CACHE_MAXSIZE)
+_off_counters = {"db_hits": 0, "db_misses": 0, "fetches": 0, "fetch_errors": 0}
+# Lookups run in threadpool threads
+_off_counters_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _off_counters_lock:
+        _off_counters[name] += 1
+
+
+def _fetch_off_product(barcode: str) -> tuple[bool, dict | None] | None:
+    """
+    Calls OpenFoodFacts for a single barcode.
+    Returns (found, product) for a definitive answer, or None when the lookup
+    failed (timeout, 5xx, ...) and the result must not be cached.
+    """
+    _count("fetches")
+    try:
+        res = requests.get(
+            f"{OPEN_FOOD_FACTS_URL}/api/v2/product/{barcode}.json",
+            timeout=OPEN_FOOD_FACTS_TIMEOUT,
+        )
+    except requests.RequestException as e:
+        _count("fetch_errors")
+        print(f"OpenFoodFacts request failed for {barcode}: {e}")
+        return None
+
+    if res.status_code == 404:
+        return False, None
+    if res.status_code != 200:
+        _count("fetch_errors")
+        print("OpenFoodFacts error:", res.status_code, res.text)
+        return None
+
+    product = res.json().get("product") or None
+    return product is not None, product
+
+
+def _store_off_product(barcode: str, found: bool, product: dict | None) -> datetime.datetime:
+    """
+    Upserts the cache row in its own session, so a lookup in the middle of a request
+    never commits the caller's unfinished work.
+    """
+    ttl = OFF_CACHE_TTL if found else OFF_NEGATIVE_CACHE_TTL
+    now = datetime.datetime.utcnow()
+    expires_at = now + datetime.timedelta(seconds=ttl)
+    values = {"found": found, "payload": product, "fetched_at": now, "expires_at": expires_at}
+    stmt = insert(models.OpenFoodFactsCache).values(barcode=barcode, **values)
+    with SessionLocal() as db:
+        db.execute(stmt.on_conflict_do_update(index_elements=[models.OpenFoodFactsCache.barcode], set_=values))
+        db.commit()
+    return expires_at
+
+
+def get_off_product(barcode: str, db: Session) -> dict | None:
+    """
+    Returns the OpenFoodFacts `product` payload for a barcode, or None if it is unknown.
+    Lookups go through an in-process LRU, then the openfoodfacts_cache table, and only
+    then to OpenFoodFacts. Found products are kept for OFF_CACHE_TTL seconds and
+    unknown barcodes for OFF_NEGATIVE_CACHE_TTL seconds.
+    """
+    cached = _off_memory_cache.get(barcode)
+    if cached is not None:
+        return cached[1]
+
+    now = datetime.datetime.utcnow()
+    row = db.query(models.OpenFoodFactsCache).filter(
+        models.OpenFoodFactsCache.barcode == barcode,
+        models.OpenFoodFactsCache.expires_at > now,
+    ).first()
+    if row:
+        _count("db_hits")
+        _off_memory_cache.set(barcode, (row.found, row.payload), ttl=(row.expires_at - now).total_seconds())
+        return row.payload
+    _count("db_misses")
+
+    result = _fetch_off_product(barcode)
+    if result is None:
+        return None
+    found, product = result
+    expires_at = _store_off_product(barcode, found, product)
+    _off_memory_cache.set(barcode, (found, product), ttl=(expires_at - now).total_seconds())
+    return product
+
+
+def off_cache_stats() -> dict:
+    with _off_counters_lock:
+        counters = dict(_off_counters)
+    return {"memory": _off_memory_cache.stats(), **counters}
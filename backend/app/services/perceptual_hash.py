@@ -0,0 +1,178 @@
+"""
+Perceptual hashing (dHash) of scan images and an in-memory BK-tree over the
+hashes of all products, used to recognize a re-scan of an already known
+product without calling the AI service.
+
+    python -m app.services.perceptual_hash --backfill
+"""
+import argparse
+import io
+import threading
+import time
+from PIL import Image, UnidentifiedImageError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import PHASH_INDEX_TTL, PHASH_MATCH_DISTANCE
+
+_HASH_SIZE = 8
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash: one bit per horizontally adjacent pixel pair of a 9x8 grayscale thumbnail."""
+    gray = image.convert("L").resize((_HASH_SIZE + 1, _HASH_SIZE), Image.LANCZOS)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(_HASH_SIZE):
+        offset = row * (_HASH_SIZE + 1)
+        for col in range(_HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return to_signed64(value)
+
+
+def dhash_bytes(image_bytes: bytes) -> int:
+    try:
+        return dhash(Image.open(io.BytesIO(image_bytes)))
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"Invalid image: {e}") from e
+
+
+def to_signed64(value: int) -> int:
+    # products.image_dhash is a BIGINT
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def hamming(a: int, b: int) -> int:
+    return ((a ^ b) & 0xFFFFFFFFFFFFFFFF).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes; each node keeps the product ids sharing its hash."""
+
+    def __init__(self):
+        self._root = None  # [hash, product_ids, {distance: child}]
+
+    def add(self, value: int, product_id: int) -> None:
+        if self._root is None:
+            self._root = [value, [product_id], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                if product_id not in node[1]:
+                    node[1].append(product_id)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [product_id], {}]
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, int]]:
+        """All (distance, product_id) within max_distance of value."""
+        results = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                results.extend((distance, product_id) for product_id in node[1])
+            # Triangle inequality: only subtrees at distance d ± max_distance can hold matches
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return results
+
+
+class PerceptualHashIndex:
+    """
+    Process-wide BK-tree of every product's image_dhash, rebuilt from the database
+    every PHASH_INDEX_TTL seconds and extended in place as products are created.
+    """
+
+    def __init__(self, ttl: float = PHASH_INDEX_TTL):
+        self.ttl = ttl
+        self._tree: BKTree | None = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _ensure(self, db: Session) -> BKTree:
+        with self._lock:
+            if self._tree is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._tree
+        rows = db.query(models.Product.id, models.Product.image_dhash).filter(models.Product.image_dhash.isnot(None)).all()
+        tree = BKTree()
+        for row in rows:
+            tree.add(row.image_dhash, row.id)
+        with self._lock:
+            self._tree = tree
+            self._loaded_at = time.monotonic()
+        return tree
+
+    def match(self, value: int, db: Session, max_distance: int = PHASH_MATCH_DISTANCE) -> int | None:
+        """
+        The product id whose hash is closest to value within max_distance, or None when
+        there is no such product or several different products tie for closest (ambiguous).
+        """
+        tree = self._ensure(db)
+        with self._lock:
+            hits = tree.search(value, max_distance)
+        if not hits:
+            return None
+        best = min(distance for distance, _ in hits)
+        closest = {product_id for distance, product_id in hits if distance == best}
+        return closest.pop() if len(closest) == 1 else None
+
+    def add(self, product_id: int, value: int | None) -> None:
+        if value is None:
+            return
+        with self._lock:
+            if self._tree is not None:
+                self._tree.add(value, product_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tree = None
+
+
+phash_index = PerceptualHashIndex()
+
+
+def backfill_dhashes(batch_size: int = 100) -> int:
+    """Computes image_dhash for existing products from their stored images."""
+    import requests
+    from app.db.db_supabase import SessionLocal
+
+    updated = 0
+    last_id = 0
+    with SessionLocal() as db:
+        while True:
+            products = (
+                db.query(models.Product)
+                .filter(models.Product.id > last_id, models.Product.image_dhash.is_(None), models.Product.image_url.isnot(None))
+                .order_by(models.Product.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not products:
+                break
+            for product in products:
+                last_id = product.id
+                try:
+                    response = requests.get(product.image_url, timeout=10)
+                    response.raise_for_status()
+                    product.image_dhash = dhash_bytes(response.content)
+                    updated += 1
+                except (requests.RequestException, ValueError) as e:
+                    print(f"Product {product.id}: skipped ({e})")
+            db.commit()
+    return updated
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Perceptual hash maintenance.")
+    parser.add_argument("--backfill", action="store_true", help="compute image_dhash for products that have none")
+    args = parser.parse_args()
+    if args.backfill:
+        print(f"Backfilled {backfill_dhashes()} products")
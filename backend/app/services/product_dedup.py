@@ -0,0 +1,127 @@
+"""
+Offline merge of near-duplicate products.
+
+Walks products in id order and, for each one, folds every later product whose
+image embedding lies within DEDUP_MATCH_THRESHOLD into it: history, reviews and
+health suggestions move to the canonical (lowest id) product and the duplicate
+is deleted. Each canonical product is merged in its own transaction together
+with the checkpoint, so an interrupted run resumes where it stopped.
+
+    python -m app.services.product_dedup [--dry-run] [--restart]
+"""
+import argparse
+import datetime
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import DEDUP_MATCH_THRESHOLD, DEDUP_BATCH_SIZE, VECTOR_SEARCH_CANDIDATES
+from app.db.db_supabase import SessionLocal
+from app.services.product_service import tune_vector_search
+
+CHECKPOINT_NAME = "product_dedup"
+# Columns the canonical product takes from a duplicate when it has no value of its own
+_FILLED_COLUMNS = ("barcode", "image_url", "generic_name", "ingredients", "categories", "brands")
+
+
+def _near_duplicates(db: Session, product: models.Product) -> list[int]:
+    # Same ORDER BY distance LIMIT k shape as most_similar_img, so the HNSW index serves it
+    rows = db.execute(text("""
+        SELECT id, barcode FROM (
+            SELECT p.id, p.barcode, p.enrichment_status,
+                   (p.image_embedding <=> (SELECT image_embedding FROM Products WHERE id = :id)) AS distance
+            FROM Products p
+            WHERE p.image_embedding IS NOT NULL
+            ORDER BY p.image_embedding <=> (SELECT image_embedding FROM Products WHERE id = :id)
+            LIMIT :candidates
+        ) candidates
+        WHERE distance < :threshold AND id > :id AND enrichment_status = 'ready'
+        ORDER BY id
+    """), {"id": product.id, "threshold": DEDUP_MATCH_THRESHOLD, "candidates": VECTOR_SEARCH_CANDIDATES}).all()
+    # Two different barcodes are two different products (e.g. flavours sharing a package design)
+    return [row.id for row in rows if not (product.barcode and row.barcode and row.barcode != product.barcode)]
+
+
+def _merge_into(db: Session, canonical: models.Product, duplicate_id: int) -> None:
+    params = {"canonical": canonical.id, "duplicate": duplicate_id}
+    # Rows the canonical product already has for the same user (or flag set) win; the rest move over
+    db.execute(text("""
+        UPDATE History AS h SET product_id = :canonical
+        WHERE h.product_id = :duplicate
+          AND NOT EXISTS (SELECT 1 FROM History c WHERE c.product_id = :canonical AND c.user_id = h.user_id)
+    """), params)
+    db.execute(text("""
+        UPDATE Reviews AS r SET product_id = :canonical
+        WHERE r.product_id = :duplicate
+          AND NOT EXISTS (SELECT 1 FROM Reviews c WHERE c.product_id = :canonical AND c.user_id = r.user_id)
+    """), params)
+    db.execute(text("""
+        UPDATE health_suggestions AS s SET product_id = :canonical
+        WHERE s.product_id = :duplicate
+          AND NOT EXISTS (
+              SELECT 1 FROM health_suggestions c
+              WHERE c.product_id = :canonical AND c.health_flags_key = s.health_flags_key AND c.image_hash = s.image_hash
+          )
+    """), params)
+
+    duplicate = db.query(models.Product).filter(models.Product.id == duplicate_id).first()
+    values = {column: getattr(duplicate, column) for column in _FILLED_COLUMNS}
+    # Whatever did not move is deleted with the duplicate (ON DELETE CASCADE). The delete is
+    # flushed first: the unit of work runs UPDATEs before DELETEs, so copying the barcode
+    # while the duplicate still exists would violate the unique barcode index.
+    db.delete(duplicate)
+    db.flush()
+    for column, value in values.items():
+        if getattr(canonical, column) in (None, "", "Unknown") and value:
+            setattr(canonical, column, value)
+    canonical.last_updated = datetime.datetime.utcnow()
+    db.flush()
+
+
+def merge_near_duplicates(dry_run: bool = False, restart: bool = False) -> dict:
+    scanned = 0
+    merged = 0
+    with SessionLocal() as db:
+        checkpoint = db.get(models.MaintenanceCheckpoint, CHECKPOINT_NAME)
+        if checkpoint is None:
+            checkpoint = models.MaintenanceCheckpoint(name=CHECKPOINT_NAME, last_id=0)
+            db.add(checkpoint)
+        last_id = 0 if restart else checkpoint.last_id
+
+        while True:
+            batch = [
+                row.id for row in db.query(models.Product.id)
+                .filter(models.Product.id > last_id, models.Product.image_embedding.isnot(None))
+                .order_by(models.Product.id)
+                .limit(DEDUP_BATCH_SIZE)
+            ]
+            if not batch:
+                break
+            for product_id in batch:
+                last_id = product_id
+                product = db.get(models.Product, product_id)
+                # Already folded into an earlier product
+                if product is None:
+                    continue
+                tune_vector_search(db)
+                duplicate_ids = _near_duplicates(db, product)
+                scanned += 1
+                merged += len(duplicate_ids)
+                if duplicate_ids:
+                    print(f"Product {product_id}: merging {duplicate_ids}")
+                if dry_run:
+                    db.rollback()
+                    continue
+                for duplicate_id in duplicate_ids:
+                    _merge_into(db, product, duplicate_id)
+                checkpoint.last_id = last_id
+                db.commit()
+    return {"scanned": scanned, "merged": merged}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Merge near-duplicate products into one canonical product.")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be merged")
+    parser.add_argument("--restart", action="store_true", help="ignore the stored checkpoint and start from the first product")
+    args = parser.parse_args()
+    print(merge_near_duplicates(dry_run=args.dry_run, restart=args.restart))
@@ -1,14 +1,20 @@
-from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
-from storage3.utils import StorageException
 from app import models, schemas
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from pgvector.sqlalchemy import Vector
+import numpy as np
 import base64
 import mimetypes
-import requests
-import uuid
+from app.core.config import (
+    IMAGE_MATCH_THRESHOLD,
+    VECTOR_SEARCH_CANDIDATES,
+    VECTOR_HNSW_EF_SEARCH,
+    VECTOR_SEARCH_MODE,
+    VECTOR_PREFILTER_CANDIDATES,
+)
 
 
 load_dotenv() 
@@ -26,16 +32,26 @@ import io
 
 def base64_to_bytes(base64_str: str) -> bytes:
     # Remove data URL prefix if present
-    match = re.match(r'data:image/(png|jpeg|jpg);base64,(.*)', base64_str)
+    match = re.match(r'data:image/(png|jpeg|jpg|webp);base64,(.*)', base64_str)
     if match:
         base64_data = match.group(2)
     else:
         base64_data = base64_str
 
     return base64.b64decode(base64_data)
+def base64_mime_type(base64_str: str, default: str = "image/jpeg") -> str:
+    match = re.match(r'data:(image/(?:png|jpeg|jpg|webp));base64,', base64_str)
+    return match.group(1) if match else default
+
+
+def bytes_to_data_uri(image_bytes: bytes, mime_type: str = "image/jpeg") -> str:
+    base64_string = base64.b64encode(image_bytes).decode("utf-8")
+    return f"data:{mime_type};base64,{base64_string}"
+
+
 def base64_to_bytesio(base64_str: str) -> io.BytesIO:
     # Remove data URL prefix
-    match = re.match(r'data:image/(png|jpeg|jpg);base64,(.*)', base64_str)
+    match = re.match(r'data:image/(png|jpeg|jpg|webp);base64,(.*)', base64_str)
     if match:
         base64_data = match.group(2)
     else:
@@ -44,19 +60,6 @@ def base64_to_bytesio(base64_str: str) -> io.BytesIO:
     image_bytes = base64.b64decode(base64_data)
     return io.BytesIO(image_bytes)
 
-def image_url_to_base64(image_url):
-    response = requests.get(image_url)
-    mime_type, _ = mimetypes.guess_type(image_url)
-    
-    if not mime_type:
-        raise ValueError("Cannot determine the MIME type of the file")
-    
-    base64_string = base64.b64encode(response.content).decode("utf-8")
-    
-    data_uri = f"data:{mime_type};base64,{base64_string}"
-    return data_uri
-
-
 def encode_image_to_base64(image_path):
     mime_type, _ = mimetypes.guess_type(image_path)
     if not mime_type:
@@ -71,204 +74,299 @@ def encode_image_to_base64(image_path):
     return data_uri
 
 
-def generate_unique_filename(extension: str = ".jpg", max_attempts: int = 10) -> str:
-    filename = f"{uuid.uuid4().hex}{extension}"
-    return filename
-    
-    # TODO: fix this
-    for _ in range(max_attempts):
-        filename = f"{uuid.uuid4().hex}{extension}"
-        try:
-            # Try to get metadata; if it exists, filename is taken
-            supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-            supabase.storage.from_(IMG_BUCKET_NAME).get_metadata(filename)
-        except Exception as e:
-            if "object not found" in str(e).lower():
-                return filename
-    raise Exception("Unable to generate a unique filename after multiple attempts.")
-
 def upload_image_to_bucket(image):
-    try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        filename = generate_unique_filename()
+    """Uploads a base64 image to the product image bucket and returns its public URL."""
+    from app.services.storage import upload_image
+    return upload_image(base64_to_bytes(image), base64_mime_type(image))
+
+
+def normalize(vector):
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        return vector
+    return vector / norm
 
-        res = supabase.storage.from_(IMG_BUCKET_NAME).upload(filename, base64_to_bytes(image))
-        
 
-    except StorageException as e:
-        raise Exception(f"Upload failed: {e.message}")
+# text-embedding-3-small is trained so that a renormalized prefix is still a usable embedding
+SHORT_EMBEDDING_DIMENSIONS = 512
 
-    public_url = f"{SUPABASE_URL}/storage/v1/object/public/{IMG_BUCKET_NAME}/{filename}"
-    return public_url
 
+def truncate_embedding(vector, dimensions: int = SHORT_EMBEDDING_DIMENSIONS):
+    """Renormalized prefix of an embedding; matches products.image_embedding_short."""
+    return normalize(np.asarray(vector, dtype=np.float32)[:dimensions])
 
-def most_similar_img(embedding, db: Session):
-    threshold = 0.2
-    query = text("""
-        SELECT name, (image_embedding <=> CAST(:embedding AS vector)) AS distance
-        FROM Products
-        WHERE image_embedding IS NOT NULL;
-    """)
 
-    params = {
-        "embedding": embedding
-    }
+def embedding_from_response(data: dict) -> np.ndarray:
+    """
+    Decodes an /image-encode response into a normalized float32 vector. The base64
+    float32 payload is used when the AI service sent one, the JSON float list otherwise.
+    """
+    if "textDescriptionEmbeddingBase64" in data:
+        vector = np.frombuffer(base64.b64decode(data["textDescriptionEmbeddingBase64"]), dtype="<f4")
+    else:
+        vector = np.asarray(data["textDescriptionEmbedding"], dtype=np.float32)
+    return normalize(vector)
+
+
+def tune_vector_search(db: Session, ef_search: int = VECTOR_HNSW_EF_SEARCH) -> None:
+    """
+    Applies the HNSW search knob to the current transaction only (set_config(..., true)
+    is SET LOCAL), which is safe behind a transaction-pooling PgBouncer.
+    """
+    db.execute(
+        text("SELECT set_config('hnsw.ef_search', :ef_search, true)"),
+        {"ef_search": str(ef_search)},
+    )
+
+
+# First-stage candidates per VECTOR_SEARCH_MODE; each is an ORDER BY distance LIMIT k its index can serve.
+# {embedding} and {short_embedding} are the query vectors: bind parameters for a single lookup,
+# columns of the unnested input for a batched one.
+_PREFILTERS = {
+    "halfvec": """
+        SELECT id FROM Products
+        WHERE image_embedding_half IS NOT NULL
+        ORDER BY image_embedding_half <=> CAST({embedding} AS halfvec(1536))
+        LIMIT :prefilter
+    """,
+    "binary": """
+        SELECT id FROM Products
+        WHERE image_embedding_bits IS NOT NULL
+        ORDER BY image_embedding_bits <~> binary_quantize({embedding})::bit(1536)
+        LIMIT :prefilter
+    """,
+    "short": """
+        SELECT id FROM Products
+        WHERE image_embedding_short IS NOT NULL
+        ORDER BY image_embedding_short <=> {short_embedding}
+        LIMIT :prefilter
+    """,
+}
+
+_SINGLE_VECTORS = {
+    "embedding": "CAST(:embedding AS vector)",
+    "short_embedding": f"CAST(:short_embedding AS vector({SHORT_EMBEDDING_DIMENSIONS}))",
+}
+_BATCH_VECTORS = {"embedding": "q.embedding", "short_embedding": "q.short_embedding"}
+
+
+def _similarity_query(sql: str):
+    """
+    Builds a similarity query once at import. Embeddings are bound through pgvector's
+    Vector type straight from float32 arrays (no Python float lists), and the
+    embedding column comes back as a float32 array instead of a string.
+    """
+    binds = []
+    if ":embeddings" in sql:
+        binds.append(bindparam("embeddings", type_=ARRAY(Vector(1536))))
+        if ":short_embeddings" in sql:
+            binds.append(bindparam("short_embeddings", type_=ARRAY(Vector(SHORT_EMBEDDING_DIMENSIONS))))
+    else:
+        binds.append(bindparam("embedding", type_=Vector(1536)))
+        if ":short_embedding" in sql:
+            binds.append(bindparam("short_embedding", type_=Vector(SHORT_EMBEDDING_DIMENSIONS)))
+    return text(sql).bindparams(*binds).columns(image_embedding=Vector(1536))
+
+
+# The inner ORDER BY distance LIMIT k is the shape the HNSW index can serve;
+# the threshold is applied to those k candidates afterwards.
+_MOST_SIMILAR_FULL = """
+    SELECT * FROM (
+        SELECT p.*, (p.image_embedding <=> {embedding}) AS distance
+        FROM Products p
+        WHERE p.image_embedding IS NOT NULL
+        ORDER BY p.image_embedding <=> {embedding}
+        LIMIT :candidates
+    ) candidates
+    WHERE distance < :threshold
+    ORDER BY distance
+    LIMIT 1
+"""
+
+# Compact-index prefilter, then an exact re-rank of those rows at full precision,
+# so the threshold keeps meaning the same cosine distance as in "full" mode
+_MOST_SIMILAR_PREFILTERED = """
+    SELECT * FROM (
+        SELECT p.*, (p.image_embedding <=> {{embedding}}) AS distance
+        FROM ({prefilter}) prefiltered
+        JOIN Products p ON p.id = prefiltered.id
+        ORDER BY distance
+        LIMIT :candidates
+    ) candidates
+    WHERE distance < :threshold
+    ORDER BY distance
+    LIMIT 1
+"""
+
+# One round trip for many query vectors: the single-vector query runs once per
+# unnested input row, and query_index says which input each match belongs to
+_MOST_SIMILAR_BATCH = """
+    SELECT q.query_index, m.*
+    FROM unnest({inputs}) WITH ORDINALITY AS q({columns}, query_index)
+    CROSS JOIN LATERAL ({query}) m
+"""
+
+# A user's history is small, so the history join drives this query rather than the ANN index
+_MOST_SIMILAR_FOR_USER = _similarity_query("""
+    SELECT * FROM (
+        SELECT p.*, (p.image_embedding <=> CAST(:embedding AS vector)) AS distance
+        FROM Products p
+        JOIN History h ON p.id = h.product_id
+        WHERE h.user_id = :current_user_id
+          AND p.image_embedding IS NOT NULL
+        ORDER BY p.image_embedding <=> CAST(:embedding AS vector)
+        LIMIT :candidates
+    ) candidates
+    WHERE distance < :threshold
+    ORDER BY distance
+    LIMIT 1
+""")
+
+
+def _mode_query(mode: str) -> str:
+    if mode in _PREFILTERS:
+        return _MOST_SIMILAR_PREFILTERED.format(prefilter=_PREFILTERS[mode])
+    return _MOST_SIMILAR_FULL
+
+
+def _batch_query(mode: str) -> str:
+    inputs, columns = "CAST(:embeddings AS vector[])", "embedding"
+    if mode == "short":
+        inputs += f", CAST(:short_embeddings AS vector({SHORT_EMBEDDING_DIMENSIONS})[])"
+        columns += ", short_embedding"
+    return _MOST_SIMILAR_BATCH.format(inputs=inputs, columns=columns, query=_mode_query(mode).format(**_BATCH_VECTORS))
+
+
+_MODES = ("full", *_PREFILTERS)
+_MOST_SIMILAR_QUERIES = {mode: _similarity_query(_mode_query(mode).format(**_SINGLE_VECTORS)) for mode in _MODES}
+_MOST_SIMILAR_BATCH_QUERIES = {mode: _similarity_query(_batch_query(mode)) for mode in _MODES}
 
-    result = db.execute(query, params).mappings().all()
-    print(f'result type: {type(result)}, result: {result}')
-    query = text("""
-        SELECT * FROM Products
-        WHERE (image_embedding <=> CAST(:embedding AS vector)) < :threshold
-        ORDER BY image_embedding <=> CAST(:embedding AS vector)
-        LIMIT 1;
-    """)
 
+def _product_from_row(row) -> models.Product:
+    return models.Product(**{key: value for key, value in row.items() if key not in ("distance", "query_index")})
+
+
+def _search_params(threshold: float | None, db: Session) -> tuple[str, dict]:
+    """Search mode and shared parameters for most_similar_img(s); also tunes the ANN scan for this transaction."""
+    mode = VECTOR_SEARCH_MODE if VECTOR_SEARCH_MODE in _MOST_SIMILAR_QUERIES else "full"
     params = {
-        "embedding": embedding, 
-        "threshold": threshold,
+        "threshold": IMAGE_MATCH_THRESHOLD if threshold is None else threshold,
+        "candidates": VECTOR_SEARCH_CANDIDATES,
     }
-    
-    result = db.execute(query, params).mappings().fetchone()
+    if mode in _PREFILTERS:
+        params["prefilter"] = VECTOR_PREFILTER_CANDIDATES
+        # HNSW returns at most ef_search rows per scan
+        tune_vector_search(db, max(VECTOR_HNSW_EF_SEARCH, VECTOR_PREFILTER_CANDIDATES))
+    else:
+        tune_vector_search(db)
+    return mode, params
+
+
+def most_similar_img(embedding, db: Session, threshold: float | None = None):
+    mode, params = _search_params(threshold, db)
+    params["embedding"] = np.asarray(embedding, dtype=np.float32)
+    if mode == "short":
+        params["short_embedding"] = truncate_embedding(embedding)
+
+    result = db.execute(_MOST_SIMILAR_QUERIES[mode], params).mappings().fetchone()
 
     if result:
-        print(f'result type: {type(result)}, result: {result}')
-        return models.Product(**result)
+        print(f'Most similar product id: {result["id"]}, distance: {result["distance"]}')
+        return _product_from_row(result)
     return None
 
+
+def most_similar_imgs(embeddings: list, db: Session, threshold: float | None = None) -> list[models.Product | None]:
+    """Batched most_similar_img: one query for all embeddings, results in input order."""
+    if not embeddings:
+        return []
+    mode, params = _search_params(threshold, db)
+    params["embeddings"] = [np.asarray(embedding, dtype=np.float32) for embedding in embeddings]
+    if mode == "short":
+        params["short_embeddings"] = [truncate_embedding(embedding) for embedding in embeddings]
+
+    matches: list[models.Product | None] = [None] * len(embeddings)
+    for row in db.execute(_MOST_SIMILAR_BATCH_QUERIES[mode], params).mappings():
+        matches[row["query_index"] - 1] = _product_from_row(row)
+    return matches
+
 def most_similar_img_for_user(
-    embedding: str,
+    embedding,
     current_user_id: int,
     db: Session
 ):
-    threshold = 0.2
-    
-    query = text("""
-        SELECT p.*
-        FROM Products p
-        JOIN History h ON p.id = h.product_id
-        WHERE h.user_id = :current_user_id
-          AND p.image_embedding IS NOT NULL
-          AND (p.image_embedding <=> CAST(:embedding AS vector)) < :threshold
-        ORDER BY (p.image_embedding <=> CAST(:embedding AS vector)) ASC
-        LIMIT 1;
-    """)
-
     params = {
-        "embedding": embedding,
-        "threshold": threshold,
-        "current_user_id": current_user_id
+        "embedding": np.asarray(embedding, dtype=np.float32),
+        "threshold": IMAGE_MATCH_THRESHOLD,
+        "current_user_id": current_user_id,
+        "candidates": VECTOR_SEARCH_CANDIDATES,
     }
     
-    result_row = db.execute(query, params).mappings().fetchone()
+    result_row = db.execute(_MOST_SIMILAR_FOR_USER, params).mappings().fetchone()
 
     if result_row:
-        print(f'Most similar product for user {current_user_id} found: type: {type(result_row)}, result: {result_row}')
-        return models.Product(**result_row)
+        print(f'Most similar product for user {current_user_id} found: id: {result_row["id"]}, distance: {result_row["distance"]}')
+        return _product_from_row(result_row)
     
     print(f'No product found for user {current_user_id} within the similarity threshold.')
     return None
 
-import numpy as np
 
-def normalize(vector):
-    norm = np.linalg.norm(vector)
-    if norm == 0:
-        return vector
-    return vector / norm
-
-
-def get_image_embedding(base64image):
-    # encoded_image = encode_image_to_base64(image_path)
-    payload = {
-        "image": base64image
-    }
-
-    headers = {
-        "Content-Type": "application/json"
-    }
-    response = requests.post(f'{AI_SERVICE_URL}/image-encode', json=payload, headers=headers)
-    if response.ok:
-        # print("Success:", response.json())
-        print("Success on image_encode_endpoint")
-    else:
-        print("Error:", response.status_code, response.text)
-    embedding = response.json()["textDescriptionEmbedding"]
-
-    return normalize(embedding).tolist()
-
-def get_AI_product_info(base64image):
-    payload = {
-        "image": base64image
-    }
-    headers = {
-        "Content-Type": "application/json"
-    }
-    response = requests.post(f'{AI_SERVICE_URL}/product-info', json=payload, headers=headers)
-    if response.ok:
-        # print("Success:", response.json())
-        print("Success on image_encode_endpoint")
-    else:
-        print("Error:", response.status_code, response.text)
-    return response.json()["response"]["productName"], response.json()["response"]["productManufacturer"], response.json()["response"]["productDescription"]
-
-def get_AI_health_suggestion(base64image, health_flags):
-    payload = {
-        "image": base64image,
-        "dietaryPref": ",".join(health_flags)
-    }
-    headers = {
-        "Content-Type": "application/json"
-    }
-    response = requests.post(f'{AI_SERVICE_URL}/health-suggestion', json=payload, headers=headers)
-    if response.ok:
-        print("Success:", response.json())
-        # print("Success on image_encode_endpoint")
-    else:
-        print("Error:", response.status_code, response.text)
-
-    return response.json()["response"]["opinion"], response.json()["response"]["reason"],
-
-if __name__ == '__main__':
-    query_image_path = "./static/picture/test_images/ingredient/milk.png"
-    # query_image_path = "C:\Users\user\家榆\LineYahoo\HackU\flavorpal-app\backend\static\picture\test_images\milk2.jpg"
-    encoded_image = encode_image_to_base64(query_image_path)
-    summary, reason = get_AI_health_suggestion(encoded_image, "peanut allergic")
-    print(f'summary: {summary}, reason: {reason}')
-
-
-
-
-def generate_ProductDetailsFrontend(product, review):
-    if review:
-        product_details = schemas.ProductDetailsFrontend(
-            id=product.id,
-            name=product.name,
-            brands=product.brands if product.brands else "Unknown",
-            barcode=product.barcode,
-            imageUrl=product.image_url,
-            categories=product.categories if product.categories else "Unknown",
-            isReviewed=True,
-            userRating=review.rating,
-            userNotes=review.note,
-            aiHealthSummary=product.ai_health_summary if product.ai_health_summary else "The image does not contain a product ingredient table to analyze for dietary preferences.",
-            aiHealthConclusion=product.ai_health_conclusion if product.ai_health_conclusion else "unknown",
-            dateScanned=product.last_updated.strftime("%Y-%m-%d, %H:%M:%S"),
-            dateReviewed=review.updated_at.strftime("%Y-%m-%d, %H:%M:%S")
-        )
-    else:
-        product_details = schemas.ProductDetailsFrontend(
-            id=product.id,
-            name=product.name,
-            brands=product.brands if product.brands else "Unknown",
-            barcode=product.barcode,
-            imageUrl=product.image_url,
-            categories=product.categories if product.categories else "Unknown",
-            isReviewed=False,
-            userRating=None,
-            userNotes=None,
-            aiHealthSummary=product.ai_health_summary if product.ai_health_summary else "The image does not contain a product ingredient table to analyze for dietary preferences.",
-            aiHealthConclusion=product.ai_health_conclusion if product.ai_health_conclusion else "unknown",
-            dateScanned=product.last_updated.strftime("%Y-%m-%d, %H:%M:%S"),
-            dateReviewed=None
-        )
-    return product_details
\ No newline at end of file
+NO_INGREDIENTS_SUMMARY = "The image does not contain a product ingredient table to analyze for dietary preferences."
+DATETIME_FORMAT = "%Y-%m-%d, %H:%M:%S"
+
+
+def generate_ProductDetailsFrontend(product, review, summary: str | None = None, conclusion: str | None = None):
+    """
+    The one product -> frontend mapper. `summary`/`conclusion` override the product's
+    default AI health fields (e.g. with the suggestion for the user's health flags).
+    Built with model_construct: every field comes from typed DB columns, so pydantic
+    validation would only repeat work.
+    """
+    summary = summary or product.ai_health_summary
+    conclusion = conclusion or product.ai_health_conclusion
+    return schemas.ProductDetailsFrontend.model_construct(
+        id=product.id,
+        name=product.name,
+        brands=product.brands if product.brands else "Unknown",
+        barcode=product.barcode,
+        imageUrl=product.image_url,
+        categories=product.categories if product.categories else "Unknown",
+        isReviewed=review is not None,
+        userRating=review.rating if review else None,
+        userNotes=review.note if review else None,
+        aiHealthSummary=summary if summary else NO_INGREDIENTS_SUMMARY,
+        aiHealthConclusion=conclusion if conclusion else "unknown",
+        dateScanned=product.last_updated.strftime(DATETIME_FORMAT),
+        dateReviewed=review.updated_at.strftime(DATETIME_FORMAT) if review else None,
+        enrichmentStatus=product.enrichment_status,
+    )
+
+
+def generate_ProductDetailsThroughBarcode(
+    product,
+    review,
+    summary: str | None = None,
+    conclusion: str | None = None,
+    image_ingredients_url: str | None = None,
+    image_nutrition_url: str | None = None,
+):
+    """Barcode-scan variant of generate_ProductDetailsFrontend."""
+    summary = summary or product.ai_health_summary
+    conclusion = conclusion or product.ai_health_conclusion
+    return schemas.ProductDetailsThroughBarcodeOut.model_construct(
+        id=product.id,
+        name=product.name,
+        barcode=product.barcode,
+        brands=product.brands if product.brands else "Unknown",
+        categories=product.categories if product.categories else "Unknown",
+        imageUrl=product.image_url,
+        imageIngredientsUrl=image_ingredients_url,
+        imageNutritionUrl=image_nutrition_url,
+        isReviewed=review is not None,
+        dateScanned=product.last_updated.strftime(DATETIME_FORMAT),
+        likesCount=review.likes_count if review else 0,
+        aiHealthSummary=summary if summary else NO_INGREDIENTS_SUMMARY,
+        aiHealthConclusion=conclusion if conclusion else "unknown",
+        enrichmentStatus=product.enrichment_status,
+    )
@@ -0,0 +1,117 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Iterable
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.core.config import REFERENCE_DATA_CHECK_INTERVAL
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    """Immutable snapshot of the badges and health_flags tables."""
+    versions: tuple
+    badges: list[schemas.Badge]
+    health_flags: list[schemas.HealthFlagOut]
+    health_flag_ids: dict[str, int] = field(default_factory=dict)
+    health_flag_names: dict[int, str] = field(default_factory=dict)
+
+
+class ReferenceDataCache:
+    """
+    Process-wide copy of the badges and health flags. Every `check_interval` seconds one
+    query reads the reference_data_versions counters (bumped by triggers on both tables);
+    the tables are reloaded only when a counter moved, so writes by other workers show
+    up within that interval. Writes made by this worker call `invalidate()` directly.
+    """
+
+    def __init__(self, check_interval: float = REFERENCE_DATA_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._data: ReferenceData | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _versions(db: Session) -> tuple:
+        rows = db.query(models.ReferenceDataVersion.name, models.ReferenceDataVersion.version).order_by(models.ReferenceDataVersion.name).all()
+        return tuple((row.name, row.version) for row in rows)
+
+    @staticmethod
+    def _load(db: Session, versions: tuple) -> ReferenceData:
+        badges = db.query(models.Badge.id, models.Badge.ref).order_by(models.Badge.id).all()
+        flags = db.query(models.HealthFlag.id, models.HealthFlag.name).order_by(models.HealthFlag.id).all()
+        return ReferenceData(
+            versions=versions,
+            badges=[schemas.Badge(id=row.id, ref=row.ref) for row in badges],
+            health_flags=[schemas.HealthFlagOut(healthFlagId=row.id, name=row.name) for row in flags],
+            health_flag_ids={row.name: row.id for row in flags},
+            health_flag_names={row.id: row.name for row in flags},
+        )
+
+    def get(self, db: Session) -> ReferenceData:
+        with self._lock:
+            data = self._data
+            if data is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return data
+        # Counters are read before the tables, so a write racing the load only causes one extra reload
+        versions = self._versions(db)
+        if data is None or versions != data.versions:
+            data = self._load(db, versions)
+        with self._lock:
+            self._data = data
+            self._checked_at = time.monotonic()
+        return data
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._data = None
+
+
+reference_data = ReferenceDataCache()
+
+
+def load_reference_data() -> None:
+    """Warms the cache at startup; a failure is logged and the first request loads it instead."""
+    from app.db.db_supabase import SessionLocal
+
+    try:
+        with SessionLocal() as db:
+            reference_data.get(db)
+    except Exception as e:
+        print(f"Reference data not preloaded: {e}")
+
+
+def health_flag_names_for(user: models.User, db: Session) -> list[str]:
+    """The user's health flag names, resolved from the cache instead of one lazy load per flag."""
+    names = reference_data.get(db).health_flag_names
+    # The authenticated-user proxy already carries the ids, so the relationship is not loaded at all
+    flag_ids = getattr(user, "health_flag_ids", None)
+    if flag_ids is not None and all(flag_id in names for flag_id in flag_ids):
+        return [names[flag_id] for flag_id in flag_ids]
+    return [
+        names.get(flag.health_flag_id) or flag.health_flag.name
+        for flag in user.user_health_flags
+    ]
+
+
+def resolve_health_flag_ids(db: Session, flag_names: Iterable[str]) -> list[int]:
+    """
+    Ids of the named health flags, in order and without duplicates. Names missing from the
+    cache are looked up (another worker may have just added them) and created if still
+    unknown. Runs in the caller's transaction; the caller commits.
+    """
+    flag_names = list(dict.fromkeys(flag_names))
+    known = reference_data.get(db).health_flag_ids
+    missing = [name for name in flag_names if name not in known]
+    if missing:
+        db.execute(
+            insert(models.HealthFlag)
+            .values([{"name": name} for name in missing])
+            .on_conflict_do_nothing(index_elements=[models.HealthFlag.name])
+        )
+        rows = db.query(models.HealthFlag.id, models.HealthFlag.name).filter(models.HealthFlag.name.in_(missing)).all()
+        known = {**known, **{row.name: row.id for row in rows}}
+        reference_data.invalidate()
+    return [known[name] for name in flag_names]
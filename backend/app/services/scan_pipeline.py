@@ -0,0 +1,39 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable
+
+logger = logging.getLogger(__name__)
+
+
+async def _timed_stage(name: str, stage: Awaitable[Any], timings: dict[str, float]) -> Any:
+    start = time.perf_counter()
+    try:
+        return await stage
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000
+
+
+async def run_scan_stages(stages: dict[str, Awaitable[Any]]) -> tuple[dict[str, Any], dict[str, float]]:
+    """
+    Awaits independent scan stages concurrently.
+    Returns (results, timings) keyed by stage name, with timings in milliseconds
+    and an extra "total" entry for the wall-clock time of the whole fan-out.
+    The first stage exception is re-raised once every stage has finished.
+    """
+    timings: dict[str, float] = {}
+    start = time.perf_counter()
+    names = list(stages)
+    outcomes = await asyncio.gather(
+        *(_timed_stage(name, stages[name], timings) for name in names),
+        return_exceptions=True,
+    )
+    timings["total"] = (time.perf_counter() - start) * 1000
+    # Every scan passes through here; timings are only formatted when debug logging is on
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Scan stage timings (ms): %s", {name: round(ms, 1) for name, ms in timings.items()})
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
+    return dict(zip(names, outcomes)), timings
+
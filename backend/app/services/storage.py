@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import threading
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import (
+    STORAGE_BACKEND,
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    IMG_BUCKET_NAME,
+    S3_ENDPOINT_URL,
+    S3_PUBLIC_URL,
+)
+
+_EXTENSIONS = {"image/png": ".png", "image/webp": ".webp"}
+
+
+def object_name_for(image_bytes: bytes, content_type: str = "image/jpeg") -> str:
+    """Content-addressed object name: the same image always maps to the same object and URL."""
+    return hashlib.sha256(image_bytes).hexdigest() + _EXTENSIONS.get(content_type, ".jpg")
+
+
+class SupabaseImageStorage:
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _bucket(self):
+        # One long-lived client per worker process instead of one per upload
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from supabase import create_client
+                    self._client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        return self._client.storage.from_(IMG_BUCKET_NAME)
+
+    def public_url(self, object_name: str) -> str:
+        return f"{SUPABASE_URL}/storage/v1/object/public/{IMG_BUCKET_NAME}/{object_name}"
+
+    def put(self, object_name: str, image_bytes: bytes, content_type: str) -> None:
+        from storage3.utils import StorageException
+        try:
+            self._bucket().upload(object_name, image_bytes, file_options={"content-type": content_type, "upsert": "true"})
+        except StorageException as e:
+            raise Exception(f"Upload failed: {e.message}")
+
+
+class S3ImageStorage:
+    """S3-compatible backend; point S3_ENDPOINT_URL at MinIO or LocalStack to run without Supabase."""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _s3(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    try:
+                        import boto3
+                    except ImportError as e:
+                        raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)") from e
+                    self._client = boto3.client("s3", endpoint_url=S3_ENDPOINT_URL)
+        return self._client
+
+    def public_url(self, object_name: str) -> str:
+        return f"{S3_PUBLIC_URL}/{IMG_BUCKET_NAME}/{object_name}"
+
+    def put(self, object_name: str, image_bytes: bytes, content_type: str) -> None:
+        self._s3().put_object(Bucket=IMG_BUCKET_NAME, Key=object_name, Body=image_bytes, ContentType=content_type)
+
+
+_BACKENDS = {"supabase": SupabaseImageStorage, "s3": S3ImageStorage}
+image_storage = _BACKENDS[STORAGE_BACKEND]()
+
+# Keeps fire-and-forget uploads referenced until they finish
+_background_uploads: set[asyncio.Task] = set()
+
+
+def image_public_url(image_bytes: bytes, content_type: str = "image/jpeg") -> str:
+    return image_storage.public_url(object_name_for(image_bytes, content_type))
+
+
+def upload_image(image_bytes: bytes, content_type: str = "image/jpeg") -> str:
+    """Uploads an image (idempotently) and returns its public URL."""
+    object_name = object_name_for(image_bytes, content_type)
+    image_storage.put(object_name, image_bytes, content_type)
+    return image_storage.public_url(object_name)
+
+
+async def upload_image_async(image_bytes: bytes, content_type: str = "image/jpeg") -> str:
+    return await run_in_threadpool(upload_image, image_bytes, content_type)
+
+
+def upload_image_background(image_bytes: bytes, content_type: str = "image/jpeg") -> str:
+    """
+    Starts the upload without waiting for it and returns the public URL right away.
+    Failures are only logged, so use this where a missing image is acceptable.
+    """
+    async def run():
+        try:
+            await upload_image_async(image_bytes, content_type)
+        except Exception as e:
+            print(f"Background upload of {object_name_for(image_bytes, content_type)} failed: {e}")
+
+    task = asyncio.get_running_loop().create_task(run())
+    _background_uploads.add(task)
+    task.add_done_callback(_background_uploads.discard)
+    return image_public_url(image_bytes, content_type)
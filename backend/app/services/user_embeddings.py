@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import IMAGE_MATCH_THRESHOLD, USER_EMBEDDING_CACHE_MAX_BYTES, USER_EMBEDDING_CACHE_TTL
+
+
+class _UserEmbeddings:
+    """Row-normalized float32 matrix of the embeddings of one user's scanned products."""
+
+    def __init__(self, product_ids: np.ndarray, matrix: np.ndarray):
+        self.product_ids = product_ids
+        self.matrix = matrix
+        self.loaded_at = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        return self.product_ids.nbytes + self.matrix.nbytes
+
+    def append(self, product_id: int, vector: np.ndarray) -> None:
+        self.product_ids = np.append(self.product_ids, np.int64(product_id))
+        self.matrix = np.vstack([self.matrix, vector[np.newaxis, :]])
+
+
+def _as_unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class UserEmbeddingCache:
+    """
+    Per-user embedding matrices, built lazily from History and evicted LRU-first
+    once their total size exceeds `max_bytes`. Entries also expire after `ttl`
+    seconds so rows written by other workers are picked up eventually.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._users: OrderedDict[int, _UserEmbeddings] = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def _load(self, user_id: int, db: Session) -> _UserEmbeddings:
+        rows = (
+            db.query(models.Product.id, models.Product.image_embedding)
+            .join(models.History, models.History.product_id == models.Product.id)
+            .filter(models.History.user_id == user_id, models.Product.image_embedding.isnot(None))
+            .distinct(models.Product.id)
+            .all()
+        )
+        if not rows:
+            return _UserEmbeddings(np.empty(0, dtype=np.int64), np.empty((0, 1536), dtype=np.float32))
+        product_ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+        matrix = _as_unit_rows(np.asarray([row.image_embedding for row in rows], dtype=np.float32))
+        return _UserEmbeddings(product_ids, matrix)
+
+    def _store(self, user_id: int, entry: _UserEmbeddings) -> None:
+        # Caller holds the lock
+        previous = self._users.pop(user_id, None)
+        if previous is not None:
+            self._nbytes -= previous.nbytes
+        self._users[user_id] = entry
+        self._nbytes += entry.nbytes
+        while self._nbytes > self.max_bytes and len(self._users) > 1:
+            _, evicted = self._users.popitem(last=False)
+            self._nbytes -= evicted.nbytes
+
+    def _get(self, user_id: int, db: Session) -> _UserEmbeddings:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and time.monotonic() - entry.loaded_at < self.ttl:
+                self._users.move_to_end(user_id)
+                return entry
+        entry = self._load(user_id, db)
+        with self._lock:
+            self._store(user_id, entry)
+        return entry
+
+    def best_match(self, user_id: int, embedding, db: Session, threshold: float = IMAGE_MATCH_THRESHOLD) -> tuple[int, float] | None:
+        """
+        Returns (product_id, cosine distance) of the user's closest scanned product,
+        or None if nothing is closer than `threshold`.
+        """
+        entry = self._get(user_id, db)
+        if len(entry.product_ids) == 0:
+            return None
+        query = _as_unit_rows(np.asarray(embedding, dtype=np.float32))
+        distances = 1.0 - entry.matrix @ query
+        best = int(np.argmin(distances))
+        if distances[best] >= threshold:
+            return None
+        return int(entry.product_ids[best]), float(distances[best])
+
+    def best_matches(self, user_id: int, embeddings: list, db: Session, threshold: float = IMAGE_MATCH_THRESHOLD) -> list[tuple[int, float] | None]:
+        """Batched best_match: one matrix-matrix product for all query embeddings."""
+        entry = self._get(user_id, db)
+        if len(entry.product_ids) == 0 or not embeddings:
+            return [None] * len(embeddings)
+        queries = _as_unit_rows(np.asarray(embeddings, dtype=np.float32))
+        distances = 1.0 - queries @ entry.matrix.T
+        best = np.argmin(distances, axis=1)
+        matches = []
+        for row, column in enumerate(best):
+            distance = float(distances[row, column])
+            matches.append((int(entry.product_ids[column]), distance) if distance < threshold else None)
+        return matches
+
+    def add(self, user_id: int, product_id: int, embedding) -> None:
+        """Adds a newly scanned product to a user's matrix if that user is cached."""
+        if embedding is None:
+            return
+        vector = _as_unit_rows(np.asarray(embedding, dtype=np.float32))
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or product_id in entry.product_ids:
+                return
+            self._nbytes -= entry.nbytes
+            entry.append(product_id, vector)
+            self._nbytes += entry.nbytes
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            entry = self._users.pop(user_id, None)
+            if entry is not None:
+                self._nbytes -= entry.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+            self._nbytes = 0
+
+    def stats(self) -> dict:
+        return {"users": len(self._users), "bytes": self._nbytes, "max_bytes": self.max_bytes}
+
+
+user_embedding_cache = UserEmbeddingCache(USER_EMBEDDING_CACHE_MAX_BYTES, USER_EMBEDDING_CACHE_TTL)
+
+
+def most_similar_img_for_user_cached(embedding, current_user_id: int, db: Session) -> models.Product | None:
+    """
+    Same result as most_similar_img_for_user, answered from the user's in-memory
+    embedding matrix instead of a distance query over their history.
+    """
+    match = user_embedding_cache.best_match(current_user_id, embedding, db)
+    if match is None:
+        print(f'No product found for user {current_user_id} within the similarity threshold.')
+        return None
+    product_id, distance = match
+    product = db.get(models.Product, product_id)
+    if product is None:
+        # The product was deleted since the matrix was built
+        user_embedding_cache.invalidate(current_user_id)
+        return None
+    print(f'Most similar product for user {current_user_id} found: id: {product_id}, distance: {distance}')
+    return product
+
+
+def most_similar_imgs_for_user_cached(embeddings: list, current_user_id: int, db: Session) -> list[models.Product | None]:
+    """
+    Batched most_similar_img_for_user_cached. Matched products are loaded with a
+    single IN query; the result is aligned with `embeddings`.
+    """
+    matches = user_embedding_cache.best_matches(current_user_id, embeddings, db)
+    product_ids = {match[0] for match in matches if match is not None}
+    products = {}
+    if product_ids:
+        products = {product.id: product for product in db.query(models.Product).filter(models.Product.id.in_(product_ids)).all()}
+    if len(products) < len(product_ids):
+        # Some matched products were deleted since the matrix was built
+        user_embedding_cache.invalidate(current_user_id)
+    return [products.get(match[0]) if match is not None else None for match in matches]
@@ -0,0 +1,59 @@
+import datetime
+from dataclasses import dataclass
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import USER_IDENTITY_CACHE_TTL, USER_IDENTITY_CACHE_MAXSIZE
+from app.utils.cache import LRUCache
+
+
+@dataclass(frozen=True)
+class UserRecord:
+    """Column values of a user (no password hash) plus their health flag ids, safe to share across sessions."""
+    id: int
+    email: str
+    name: str
+    created_at: datetime.datetime | None
+    updated_at: datetime.datetime | None
+    total_taste_points: int | None
+    health_flag_ids: tuple[int, ...]
+
+
+# Entries expire after USER_IDENTITY_CACHE_TTL so updates made through other workers are picked up;
+# this worker's own updates and deletes drop them right away (invalidate_user_identity).
+user_identity_cache = LRUCache(maxsize=USER_IDENTITY_CACHE_MAXSIZE, ttl=USER_IDENTITY_CACHE_TTL)
+
+
+def load_user_record(db: Session, user_id: int | None = None, email: str | None = None) -> UserRecord | None:
+    """Reads a user by id (or by email, for tokens issued without a user_id claim) and caches the record."""
+    query = db.query(
+        models.User.id, models.User.email, models.User.name,
+        models.User.created_at, models.User.updated_at, models.User.total_taste_points,
+    )
+    row = query.filter(models.User.id == user_id).first() if user_id is not None else query.filter(models.User.email == email).first()
+    if row is None:
+        return None
+    flag_ids = db.query(models.UserHealthFlag.health_flag_id).filter(models.UserHealthFlag.user_id == row.id).all()
+    record = UserRecord(
+        id=row.id,
+        email=row.email,
+        name=row.name,
+        created_at=row.created_at,
+        updated_at=row.updated_at,
+        total_taste_points=row.total_taste_points,
+        health_flag_ids=tuple(flag.health_flag_id for flag in flag_ids),
+    )
+    user_identity_cache.set(record.id, record)
+    return record
+
+
+def cached_user_record(user_id: int) -> UserRecord | None:
+    return user_identity_cache.get(user_id)
+
+
+def invalidate_user_identity(user_id: int | None = None) -> None:
+    """Drops one user's cached record, or every record when user_id is None."""
+    if user_id is None:
+        user_identity_cache.clear()
+    else:
+        user_identity_cache.pop(user_id)
@@ -0,0 +1,85 @@
+# backend/app/utils/conditional.py
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request
+from starlette.responses import Response as StarletteResponse
+
+# Responses differ per user: browsers may keep them, shared caches may not, and every reuse is revalidated
+CACHE_CONTROL = "private, no-cache"
+
+
+@dataclass(frozen=True)
+class ListingVersion:
+    """
+    Version stamp of a per-user listing. `etag` covers everything the payload depends on
+    (including row counts, so deletions change it); `last_modified` is the newest timestamp
+    among the stamped rows and only moves forward, so it does not notice deletions.
+    """
+    etag: str
+    last_modified: Optional[datetime]
+
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = http_date(self.last_modified)
+        return headers
+
+
+def make_version(namespace: str, *parts: Any, last_modified: Optional[datetime] = None) -> ListingVersion:
+    """
+    Builds a weak ETag from the listing's stamps. Timestamps in `parts` should be given at
+    full precision; `last_modified` is the newest of them (None when the listing is empty).
+    """
+    raw = "|".join([namespace, *(p.isoformat() if isinstance(p, datetime) else str(p) for p in parts)])
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+    return ListingVersion(etag=f'W/"{digest}"', last_modified=last_modified)
+
+
+def http_date(value: datetime) -> str:
+    """Formats a naive UTC (or aware) datetime as an HTTP-date."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/ prefixes are ignored
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _not_modified_since(if_modified_since: str, last_modified: Optional[datetime]) -> bool:
+    if last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP-dates have whole-second precision
+    return last_modified.replace(microsecond=0) <= since
+
+
+def not_modified(request: Request, version: ListingVersion) -> Optional[StarletteResponse]:
+    """
+    Returns a bodiless 304 when the request's validators still match `version`, else None.
+    If-None-Match takes precedence; If-Modified-Since is only consulted without it (RFC 9110).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, version.etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = if_modified_since is not None and _not_modified_since(if_modified_since, version.last_modified)
+    if not fresh:
+        return None
+    return StarletteResponse(status_code=304, headers=version.headers())
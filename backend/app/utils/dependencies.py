@@ -1,44 +1,97 @@
 # backend/app/utils/dependencies.py
+from typing import Any
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 from pydantic import ValidationError
 
+from app import services
 from app.utils.security import SECRET_KEY, ALGORITHM, TokenData
-from app.crud.user import get_user_by_email
 from app.db.db import get_db
 from app.models import User as UserModel
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token") 
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+class CurrentUser:
+    """
+    Stands in for the authenticated models.User. Column values (id, email, name, ...) come
+    from the cached UserRecord; anything else, such as relationships, loads the User row
+    into the request's session on first access, so most requests never query users.
+    """
+
+    def __init__(self, record: services.UserRecord, db: Session):
+        self._record = record
+        self._db = db
+        self._user: UserModel | None = None
+
+    @property
+    def id(self) -> int:
+        return self._record.id
+
+    @property
+    def health_flag_ids(self) -> tuple[int, ...]:
+        return self._record.health_flag_ids
+
+    def _load(self) -> UserModel:
+        if self._user is None:
+            user = self._db.get(UserModel, self._record.id)
+            if user is None:
+                # Deleted since the record was cached (e.g. through another worker)
+                services.invalidate_user_identity(self._record.id)
+                raise _credentials_exception()
+            self._user = user
+        return self._user
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for attributes not defined on the proxy itself
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in services.UserRecord.__dataclass_fields__:
+            return getattr(self._record, name)
+        return getattr(self._load(), name)
+
+    def __repr__(self) -> str:
+        return f"<CurrentUser id={self.id} email={self._record.email}>"
+
 
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), 
+    token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
-) -> UserModel:
+) -> CurrentUser:
     """
     Dependency to get the current authenticated user from a JWT token.
-    Decodes the token, validates it, and fetches the user from the database.
+    Decodes the token and resolves the user from its `user_id` claim through the identity
+    cache; the database is only read on a cache miss, off the event loop. Tokens issued
+    before the claim existed fall back to a lookup by email.
     Raises HTTPException if the token is invalid or the user doesn't exist.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    credentials_exception = _credentials_exception()
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str | None = payload.get("sub")
         if email is None:
             raise credentials_exception
         # Validate the payload structure using your TokenData schema
-        token_data = TokenData(sub=email) 
+        token_data = TokenData(sub=email, user_id=payload.get("user_id"))
     except JWTError:
         raise credentials_exception
     except ValidationError: # If payload doesn't match TokenData schema
         raise credentials_exception
-    
-    user = get_user_by_email(db, email=token_data.sub)
-    if user is None:
+
+    record = services.cached_user_record(token_data.user_id) if token_data.user_id is not None else None
+    if record is None:
+        record = await run_in_threadpool(services.load_user_record, db, token_data.user_id, token_data.sub)
+    if record is None or record.email != token_data.sub:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return CurrentUser(record, db)
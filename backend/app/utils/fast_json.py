@@ -0,0 +1,27 @@
+# backend/app/utils/fast_json.py
+from typing import Any, Optional
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson; pydantic models (e.g. the product mappers' output) are dumped natively."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def fast_response(data: Any, msg: str, code: int = 200, headers: Optional[dict] = None) -> FastJSONResponse:
+    """
+    Returns the usual {code, data, msg} envelope as a ready Response. FastAPI passes a
+    returned Response through untouched, so the route's response_model (kept for the
+    OpenAPI docs) is not validated again for payloads that are already typed.
+    """
+    return FastJSONResponse(content={"code": code, "data": data, "msg": msg}, headers=headers)
@@ -0,0 +1,26 @@
+# backend/app/utils/pagination.py
+import base64
+from datetime import datetime
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_updated: datetime, row_id: int) -> str:
+    """
+    Encodes the (last_updated, id) keyset of the last row of a page into an opaque cursor.
+    """
+    raw = f"{last_updated.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decodes a cursor produced by encode_cursor back into its (last_updated, id) keyset.
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        last_updated, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(last_updated), int(row_id)
+    except (UnicodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
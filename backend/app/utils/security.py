@@ -36,8 +36,7 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get('JWT_EXPIRATION_TIME'))
 # Pydantic model for data expected/encoded in the JWT
 class TokenData(BaseModel):
     sub: Optional[str] = None # "sub" (subject) is a standard claim, typically username/email
-    # can add other custom claims if needed, e.g., user_id
-    # user_id: Optional[int] = None 
+    user_id: Optional[int] = None # Resolves the current user without a lookup by email
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
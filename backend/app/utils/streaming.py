@@ -0,0 +1,47 @@
+# backend/app/utils/streaming.py
+from typing import Callable, Iterator
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import STREAM_CHUNK_SIZE
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request, stream: bool = False) -> bool:
+    """
+    Returns True if the client opted into NDJSON streaming, either with the
+    `stream` query flag or with an `Accept: application/x-ndjson` header.
+    """
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(
+    session_factory: Callable[[], Session],
+    build_query: Callable[[Session], Query],
+    serialize: Callable[[object], BaseModel],
+) -> StreamingResponse:
+    """
+    Streams every row of a query as one JSON document per line.
+    Rows are pulled through a server-side cursor in STREAM_CHUNK_SIZE batches and
+    written out batch by batch, so memory stays flat regardless of table size.
+    The stream owns its own session because request-scoped sessions may be
+    closed before the body has finished sending.
+    """
+    def iter_lines() -> Iterator[bytes]:
+        db = session_factory()
+        try:
+            lines = []
+            for row in build_query(db).yield_per(STREAM_CHUNK_SIZE):
+                lines.append(serialize(row).model_dump_json())
+                if len(lines) >= STREAM_CHUNK_SIZE:
+                    yield ("\n".join(lines) + "\n").encode("utf-8")
+                    lines = []
+            if lines:
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+        finally:
+            db.close()
+
+    return StreamingResponse(iter_lines(), media_type=NDJSON_MEDIA_TYPE)
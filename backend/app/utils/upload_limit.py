@@ -0,0 +1,82 @@
+# backend/app/utils/upload_limit.py
+from fastapi.responses import JSONResponse
+from app.utils import response
+
+
+class _UploadTooLarge(Exception):
+    pass
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects request bodies over max_bytes on the given path suffixes with a 413
+    before they are parsed: up front from Content-Length, or, for chunked bodies
+    without one, as soon as the chunks passed through to the app exceed the limit.
+    Nothing is buffered here; the app spools the body as usual.
+    """
+
+    def __init__(self, app, max_bytes: int, path_suffixes: tuple[str, ...]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_suffixes = path_suffixes
+
+    def _too_large(self):
+        return JSONResponse(
+            status_code=413,
+            content=response.error(msg=f"Upload exceeds {self.max_bytes} bytes", code=413),
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].endswith(self.path_suffixes):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit():
+            if int(content_length) > self.max_bytes:
+                await self._too_large()(scope, receive, send)
+                return
+            # The server never delivers more than the declared length
+            await self.app(scope, receive, send)
+            return
+
+        received = 0
+        overflowed = False
+        started = False
+        rejected = False
+
+        async def counting_receive():
+            nonlocal received, overflowed
+            if overflowed:
+                raise _UploadTooLarge()
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    overflowed = True
+                    raise _UploadTooLarge()
+            return message
+
+        async def reject():
+            nonlocal rejected
+            rejected = True
+            await self._too_large()(scope, receive, send)
+
+        async def guarded_send(message):
+            nonlocal started
+            if overflowed and not started:
+                # FastAPI turns exceptions raised while it parses the body into a 400;
+                # that response is replaced by the 413
+                if not rejected:
+                    await reject()
+                return
+            started = True
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, guarded_send)
+        except _UploadTooLarge:
+            if started:
+                raise
+            if not rejected:
+                await reject()
@@ -0,0 +1,71 @@
+"""
+Serialization cost per product item for list responses.
+
+Compares the old path (validated ProductDetailsFrontend models, revalidated against
+Response[List[...]] and encoded with jsonable_encoder + json) with the fast path
+(model_construct mapper + FastJSONResponse/orjson).
+
+    cd backend && python -m benchmarks.serialization [--items 5000] [--repeat 5]
+"""
+import argparse
+import datetime
+import json
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+
+from app import models, schemas
+from app.services.product_service import generate_ProductDetailsFrontend
+from app.utils.fast_json import fast_response
+from app.utils.ResponseResult import Response
+
+
+def _rows(count: int):
+    now = datetime.datetime.utcnow()
+    rows = []
+    for i in range(count):
+        product = models.Product(
+            id=i, name=f"Product {i}", barcode=str(4900000000000 + i), image_url=f"https://example.com/{i}.jpg",
+            categories="Snacks", brands="Brand", ai_health_summary="Summary " * 20, ai_health_conclusion="good",
+            last_updated=now, enrichment_status="ready",
+        )
+        review = models.Review(rating=4, note="Tasty", updated_at=now, likes_count=3) if i % 3 == 0 else None
+        rows.append((product, review))
+    return rows
+
+
+def _validated_path(rows) -> bytes:
+    data = [
+        schemas.ProductDetailsFrontend(**generate_ProductDetailsFrontend(product, review).model_dump())
+        for product, review in rows
+    ]
+    envelope = Response[List[schemas.ProductDetailsFrontend]](code=200, data=data, msg="ok")
+    # What FastAPI does with a response_model: dump, validate again, encode
+    revalidated = Response[List[schemas.ProductDetailsFrontend]].model_validate(envelope.model_dump())
+    return json.dumps(jsonable_encoder(revalidated)).encode("utf-8")
+
+
+def _fast_path(rows) -> bytes:
+    return fast_response([generate_ProductDetailsFrontend(product, review) for product, review in rows], "ok").body
+
+
+def _time_per_item(fn, rows, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best / len(rows) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = _rows(args.items)
+    assert json.loads(_validated_path(rows[:50])) == json.loads(_fast_path(rows[:50]))
+    for name, fn in (("validated + json", _validated_path), ("model_construct + orjson", _fast_path)):
+        print(f"{name:>26}: {_time_per_item(fn, rows, args.repeat):7.2f} us/item ({args.items} items, best of {args.repeat})")
@@ -0,0 +1,41 @@
+from app import models, services
+from app.routers import products
+
+
+def _queued_flags(db, product_id):
+    return [job.payload["health_flags"] for job in db.query(models.EnrichmentJob).filter(models.EnrichmentJob.product_id == product_id)]
+
+
+def test_queue_health_suggestion_once_per_flag_set(db):
+    product = models.Product(name="Sea Salt Chips", barcode="4901234567890")
+    db.add(product)
+    db.flush()
+    # The flight leader's job, queued for its own health flags
+    services.enqueue_enrichment(db, product, services.ENRICH_BARCODE_PRODUCT, {
+        "user_id": 1, "image_url": None, "image_ingredients_url": "https://off/ingredients.jpg", "health_flags": ["gluten", "lactose"],
+    })
+    db.commit()
+
+    # A follower with the same flags in another order, then one with different flags
+    products._queue_health_suggestion(db, product, 2, ["lactose", "gluten"])
+    products._queue_health_suggestion(db, product, 3, ["peanuts"])
+    db.commit()
+
+    assert _queued_flags(db, product.id) == [["gluten", "lactose"], ["peanuts"]]
+    # The ingredients image is looked up by the worker, not by the scan request
+    follower_job = db.query(models.EnrichmentJob).filter(models.EnrichmentJob.health_flags_key == "peanuts").one()
+    assert follower_job.payload == {"user_id": 3, "health_flags": ["peanuts"]}
+
+
+def test_queue_health_suggestion_again_once_earlier_job_is_done(db):
+    product = models.Product(name="Sea Salt Chips", barcode="4901234567890")
+    db.add(product)
+    db.flush()
+    job = services.enqueue_enrichment(db, product, services.ENRICH_BARCODE_PRODUCT, {"user_id": 1, "health_flags": ["gluten"]})
+    job.status = "failed"
+    db.commit()
+
+    products._queue_health_suggestion(db, product, 2, ["gluten"])
+    db.commit()
+
+    assert _queued_flags(db, product.id) == [["gluten"], ["gluten"]]
@@ -0,0 +1,38 @@
+import datetime
+
+from app import models, services
+
+
+def _user_with_history(db):
+    product = models.Product(name="Sea Salt Chips", barcode="4901234567890", last_updated=datetime.datetime(2026, 1, 1))
+    db.add(product)
+    db.flush()
+    db.add(models.History(user_id=1, product_id=product.id, scanned_at=datetime.datetime(2026, 1, 1)))
+    db.commit()
+    return product
+
+
+def test_product_list_version_moves_with_suggestions_for_the_flag_key(db):
+    product = _user_with_history(db)
+    before = services.product_list_version(db, 1, "gluten")
+
+    db.add(models.HealthSuggestion(product_id=product.id, health_flags_key="lactose", image_hash="a", created_at=datetime.datetime(2026, 2, 1)))
+    db.commit()
+    assert services.product_list_version(db, 1, "gluten") == before
+
+    db.add(models.HealthSuggestion(product_id=product.id, health_flags_key="gluten", image_hash="a", created_at=datetime.datetime(2026, 3, 1)))
+    db.commit()
+    after = services.product_list_version(db, 1, "gluten")
+    assert after.etag != before.etag
+    assert after.last_modified == datetime.datetime(2026, 3, 1)
+
+
+def test_product_list_version_moves_with_product_updates(db):
+    product = _user_with_history(db)
+    before = services.product_list_version(db, 1, "")
+
+    product.last_updated = datetime.datetime(2026, 4, 1)
+    db.commit()
+    after = services.product_list_version(db, 1, "")
+    assert after.etag != before.etag
+    assert after.last_modified == datetime.datetime(2026, 4, 1)
@@ -0,0 +1,47 @@
+from app import models
+from app.services.product_dedup import _merge_into
+
+
+def test_merge_copies_barcode_from_duplicate_onto_image_only_product(db):
+    # An image-only scan, later scanned again by barcode as a separate product
+    canonical = models.Product(name="Unknown")
+    duplicate = models.Product(name="Sea Salt Chips", barcode="4901234567890", brands="Calbee")
+    db.add_all([canonical, duplicate])
+    db.flush()
+    db.add_all([
+        models.History(user_id=1, product_id=canonical.id),
+        models.History(user_id=2, product_id=duplicate.id),
+        models.Review(user_id=2, product_id=duplicate.id, rating=4),
+    ])
+    db.commit()
+    duplicate_id = duplicate.id
+
+    _merge_into(db, canonical, duplicate_id)
+    db.commit()
+
+    assert db.get(models.Product, duplicate_id) is None
+    db.refresh(canonical)
+    assert canonical.barcode == "4901234567890"
+    assert canonical.brands == "Calbee"
+    assert canonical.last_updated is not None
+    assert sorted(user for user, in db.query(models.History.user_id).filter(models.History.product_id == canonical.id)) == [1, 2]
+    assert db.query(models.Review).filter(models.Review.product_id == canonical.id).count() == 1
+
+
+def test_merge_keeps_canonical_rows_for_users_on_both_products(db):
+    canonical = models.Product(name="Chips", barcode="111")
+    duplicate = models.Product(name="Chips")
+    db.add_all([canonical, duplicate])
+    db.flush()
+    db.add_all([
+        models.Review(user_id=1, product_id=canonical.id, rating=5),
+        models.Review(user_id=1, product_id=duplicate.id, rating=2),
+    ])
+    db.commit()
+
+    _merge_into(db, canonical, duplicate.id)
+    db.commit()
+
+    ratings = [rating for rating, in db.query(models.Review.rating).filter(models.Review.user_id == 1)]
+    assert ratings == [5]
+    assert canonical.barcode == "111"
@@ -0,0 +1,84 @@
+import asyncio
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.utils.upload_limit import UploadSizeLimitMiddleware
+
+MAX_BYTES = 1024
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MAX_BYTES, path_suffixes=("/upload",))
+
+    @app.post("/image/upload")
+    async def upload(image: UploadFile = File(...)):
+        return {"size": len(await image.read())}
+
+    return TestClient(app)
+
+
+def _multipart(payload: bytes) -> tuple[bytes, str]:
+    boundary = "testboundary"
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="image"; filename="front.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def _chunked(body: bytes, chunk_size: int = 256):
+    # A generator body is sent with Transfer-Encoding: chunked, without Content-Length
+    for start in range(0, len(body), chunk_size):
+        yield body[start:start + chunk_size]
+
+
+def test_content_length_over_limit_is_rejected():
+    body, content_type = _multipart(b"x" * (MAX_BYTES * 2))
+    response = _client().post("/image/upload", content=body, headers={"Content-Type": content_type})
+    assert response.status_code == 413
+    assert response.json()["code"] == 413
+
+
+def test_chunked_upload_over_limit_is_rejected_with_413():
+    body, content_type = _multipart(b"x" * (MAX_BYTES * 2))
+    response = _client().post("/image/upload", content=_chunked(body), headers={"Content-Type": content_type})
+    assert response.status_code == 413
+    assert response.json()["code"] == 413
+
+
+def test_chunked_upload_within_limit_reaches_the_app():
+    body, content_type = _multipart(b"x" * 512)
+    response = _client().post("/image/upload", content=_chunked(body), headers={"Content-Type": content_type})
+    assert response.status_code == 200
+    assert response.json() == {"size": 512}
+
+
+
+def test_chunked_body_is_passed_through_chunk_by_chunk():
+    # TestClient sends a generator body as one message, so drive the ASGI interface directly
+    chunks = [b"x" * 250] * 4
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1} for i, chunk in enumerate(chunks)]
+    seen, sent = [], []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    async def app(scope, receive, send):
+        while True:
+            message = await receive()
+            seen.append(len(message["body"]))
+            if not message["more_body"]:
+                break
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    scope = {"type": "http", "method": "POST", "path": "/image/upload", "headers": []}
+    asyncio.run(UploadSizeLimitMiddleware(app, max_bytes=MAX_BYTES, path_suffixes=("/upload",))(scope, receive, send))
+    assert seen == [250, 250, 250, 250]
+    assert sent[0]["status"] == 204